@@ -0,0 +1,180 @@
+"""End-to-end benchmark suite.
+
+Times each pipeline stage separately over a synthetic corpus, writes the
+results as JSON and compares them with a stored baseline:
+
+    uv run -m bench --pages 200
+    uv run -m bench --update-baseline
+
+The run fails with exit status 1 when a stage is slower than the baseline
+by more than the tolerance factor.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from bench.corpus import generate_pages, write_corpus
+from src.block_md import BlockType, block_to_block_type, md_to_blocks, md_to_html_node
+from src.inline_md import text_to_textnodes
+from src.page import generate_pages_recursive
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+
+def best_of(func, repeat: int) -> float:
+    # Like timeit, keep the garbage collector out of the measurement.
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return min(timings)
+
+
+def calibrate(repeat: int) -> float:
+    """Time a fixed pure-Python workload, used to normalise stage timings so
+    baselines survive moving between machines of different speed."""
+
+    def workload():
+        total = 0
+        for i in range(200_000):
+            total += len(str(i))
+        return total
+
+    return best_of(workload, repeat)
+
+
+def run_stages(pages: int, seed: int, depth: int, scale: int, repeat: int) -> dict:
+    documents = [markdown for _, markdown in generate_pages(pages, seed, depth, scale)]
+    blocks = [block for markdown in documents for block in md_to_blocks(markdown)]
+    inline_blocks = [
+        block for block in blocks if block_to_block_type(block) != BlockType.CODE
+    ]
+    trees = [md_to_html_node(markdown) for markdown in documents]
+
+    stages = {
+        "md_to_blocks": lambda: [md_to_blocks(markdown) for markdown in documents],
+        "block_to_block_type": lambda: [block_to_block_type(b) for b in blocks],
+        "text_to_textnodes": lambda: [text_to_textnodes(b) for b in inline_blocks],
+        "ParentNode.to_html": lambda: [tree.to_html() for tree in trees],
+    }
+    results = {name: best_of(func, repeat) for name, func in stages.items()}
+
+    with tempfile.TemporaryDirectory() as root:
+        content = os.path.join(root, "content")
+        template = os.path.join(root, "template.html")
+        write_corpus(content, pages, seed, depth, scale)
+        with open(template, "w") as f:
+            f.write(TEMPLATE)
+        run = iter(range(repeat))
+
+        def build():
+            dest = os.path.join(root, f"docs-{next(run)}")
+            with open(os.devnull, "w") as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    generate_pages_recursive("/", content, template, dest)
+
+        results["generate_pages_recursive"] = best_of(build, repeat)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    # Ratios are taken on timings relative to each run's calibration workload.
+    speed = baseline["calibration"] / results["calibration"]
+    regressions = []
+    print(f"{'stage':<28}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for stage, seconds in results["stages"].items():
+        expected = baseline["stages"].get(stage)
+        if expected is None:
+            print(f"{stage:<28}{'-':>12}{seconds * 1e3:>10.2f}ms")
+            continue
+        ratio = seconds * speed / expected
+        flag = "  REGRESSION" if ratio > tolerance else ""
+        print(
+            f"{stage:<28}{expected * 1e3:>10.2f}ms{seconds * 1e3:>10.2f}ms"
+            f"{ratio:>7.2f}x{flag}"
+        )
+        if flag:
+            regressions.append(stage)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the site generator.")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="fail when a stage is slower than baseline by more than this factor",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="store this run as the new baseline instead of comparing",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    corpus = {
+        "pages": args.pages,
+        "seed": args.seed,
+        "depth": args.depth,
+        "scale": args.scale,
+    }
+    results = {
+        "python": platform.python_version(),
+        "corpus": corpus,
+        "calibration": calibrate(args.repeat),
+        "stages": run_stages(repeat=args.repeat, **corpus),
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"INFO: results written to '{args.output}'")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: baseline updated at '{args.baseline}'")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"WARNING: no baseline at '{args.baseline}', nothing to compare")
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    if baseline.get("corpus") != corpus:
+        print(
+            "WARNING: baseline was recorded with a different corpus, ratios are rough"
+        )
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"ERROR: performance regression in: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Compare the fused block parser with separate classify and clean steps.
+
+`classify_then_clean` reproduces the previous pipeline: classify with
+`block_to_block_type` as it was, then extract the content with the block
+regexes. Run with `uv run -m bench.bench_blocks`.
+"""
+
+import random
+import timeit
+
+from bench.corpus import long_list, quote
+from src.block_md import (
+    RE_OL_ITEM,
+    RE_UL_ITEM,
+    BlockType,
+    clean_block_text,
+    parse_block,
+)
+
+
+def block_to_block_type_regex(block):
+    lines = block.split("\n")
+    if block.startswith("#"):
+        count = len(block) - len(block.lstrip("#"))
+        if 1 <= count <= 6 and block[count : count + 1] == " ":
+            return BlockType.HEADING
+    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+        return BlockType.CODE
+    if block.startswith("> ") and all(line.startswith(">") for line in lines):
+        return BlockType.QUOTE
+    if block.startswith("- ") and all(line.startswith("- ") for line in lines):
+        return BlockType.UNORDERED_LIST
+    ordered_prefixes = tuple(f"{i}. " for i in range(1, 10))
+    if block.startswith(ordered_prefixes) and all(
+        line.startswith(ordered_prefixes) for line in lines
+    ):
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def classify_then_clean(block):
+    block_type = block_to_block_type_regex(block)
+    match block_type:
+        case BlockType.UNORDERED_LIST:
+            return block_type, RE_UL_ITEM.findall(block)
+        case BlockType.ORDERED_LIST:
+            return block_type, RE_OL_ITEM.findall(block)
+        case _:
+            return block_type, clean_block_text(block_type, block)
+
+
+def corpora():
+    rng = random.Random(0)
+    return {
+        "unordered list": [long_list(rng, items=50) for _ in range(50)],
+        "ordered list": [long_list(rng, items=50, ordered=True) for _ in range(50)],
+        "quote": [quote(rng, lines=50) for _ in range(50)],
+    }
+
+
+def main():
+    print(f"{'corpus':<16}{'separate':>12}{'fused':>12}{'speedup':>9}")
+    for name, blocks in corpora().items():
+        old = min(
+            timeit.repeat(
+                lambda: [classify_then_clean(b) for b in blocks], number=20, repeat=5
+            )
+        )
+        new = min(
+            timeit.repeat(lambda: [parse_block(b) for b in blocks], number=20, repeat=5)
+        )
+        per_block = 20 * len(blocks)
+        print(
+            f"{name:<16}{old / per_block * 1e6:>10.1f}us"
+            f"{new / per_block * 1e6:>10.1f}us{old / new:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
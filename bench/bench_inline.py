@@ -0,0 +1,68 @@
+"""Compare the single-pass inline tokenizer with the old five-pass chain.
+
+Run with `uv run -m bench.bench_inline`.
+"""
+
+import timeit
+
+from src.inline_md import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from src.textnode import TextNode, TextType
+
+
+def text_to_textnodes_multipass(text):
+    nodes = [TextNode(text=text, text_type=TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def link_dense(count):
+    return " ".join(
+        f"see [link {i}](/pages/{i}) and ![image {i}](/images/{i}.png)"
+        for i in range(count)
+    )
+
+
+def emphasis_dense(count):
+    return " ".join(
+        f"**bold {i}** then _italic {i}_ and `code {i}`" for i in range(count)
+    )
+
+
+CORPORA = {
+    "link-dense": link_dense,
+    "emphasis-dense": emphasis_dense,
+}
+
+
+def main():
+    print(f"{'corpus':<16}{'items':>7}{'multipass':>12}{'single':>12}{'speedup':>9}")
+    for name, make_text in CORPORA.items():
+        for count in (10, 100, 1000):
+            text = make_text(count)
+            assert text_to_textnodes(text) == text_to_textnodes_multipass(text)
+            number = max(1, 2000 // count)
+            old = min(
+                timeit.repeat(
+                    lambda: text_to_textnodes_multipass(text), number=number, repeat=3
+                )
+            )
+            new = min(
+                timeit.repeat(lambda: text_to_textnodes(text), number=number, repeat=3)
+            )
+            print(
+                f"{name:<16}{count:>7}{old / number * 1e3:>10.3f}ms"
+                f"{new / number * 1e3:>10.3f}ms{old / new:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
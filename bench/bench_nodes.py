@@ -0,0 +1,79 @@
+"""Measure the memory cost of the node classes with tracemalloc.
+
+The dict-backed classes below mirror the node classes as they were before
+they gained `__slots__`, so both layouts can be measured side by side.
+Run with `uv run -m bench.bench_nodes`.
+"""
+
+import tracemalloc
+
+from src.htmlnode import LeafNode, ParentNode
+from src.textnode import TextNode, TextType
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictHTMLNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, tag, value, props=None):
+        super().__init__(tag=tag, value=value, children=None, props=props)
+
+
+class DictParentNode(DictHTMLNode):
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag=tag, value=None, children=children, props=props)
+
+
+LAYOUTS = {
+    "dict": {"text": DictTextNode, "leaf": DictLeafNode, "parent": DictParentNode},
+    "slots": {"text": TextNode, "leaf": LeafNode, "parent": ParentNode},
+}
+
+
+def bytes_per_node(factory, count):
+    # The node payload (strings, enum members) is shared between all nodes so
+    # that only the node objects themselves are measured.
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        nodes = [factory() for _ in range(count)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del nodes
+    return allocated / count
+
+
+def main(count=100_000):
+    print(f"{'node':<8}{'dict':>10}{'slots':>10}{'saved':>8}")
+    results = {}
+    for layout, classes in LAYOUTS.items():
+        children = [classes["leaf"]("b", "text")]
+        results[layout] = {
+            "text": bytes_per_node(
+                lambda: classes["text"]("text", TextType.BOLD), count
+            ),
+            "leaf": bytes_per_node(lambda: classes["leaf"]("b", "text"), count),
+            "parent": bytes_per_node(lambda: classes["parent"]("p", children), count),
+        }
+    for kind in ("text", "leaf", "parent"):
+        old = results["dict"][kind]
+        new = results["slots"][kind]
+        print(f"{kind:<8}{old:>9.1f}B{new:>9.1f}B{1 - new / old:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
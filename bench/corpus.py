@@ -0,0 +1,112 @@
+"""Deterministic synthetic markdown corpus for the benchmarks.
+
+The same `seed` always produces byte-identical files, so timings taken on
+different commits measure the code and not the input.
+"""
+
+import os
+import random
+
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron "
+    "elves dwarves and men gathered at rivendell under the counsel of elrond "
+    "frodo and sam walked through mordor while aragorn rode to gondor"
+).split()
+
+KINDS = ("prose", "code", "list", "links", "quote")
+
+
+def sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def emphasis_paragraph(rng: random.Random, sentences: int = 6) -> str:
+    parts = []
+    for i in range(sentences):
+        text = sentence(rng)
+        match i % 4:
+            case 1:
+                text = f"**{text}**"
+            case 2:
+                text = f"_{text}_"
+            case 3:
+                text = f"`{rng.choice(WORDS)}` {text}"
+        parts.append(text)
+    return " ".join(parts)
+
+
+def link_paragraph(rng: random.Random, links: int = 40) -> str:
+    parts = []
+    for i in range(links):
+        word = rng.choice(WORDS)
+        if i % 5 == 0:
+            parts.append(f"![{word} image](/images/{word}-{i}.png)")
+        else:
+            parts.append(f"see [{word} {i}](/pages/{word}/{i}) now")
+    return " ".join(parts)
+
+
+def code_block(rng: random.Random, functions: int = 40) -> str:
+    lines = ["```python"]
+    for i in range(functions):
+        name = f"{rng.choice(WORDS)}_{i}"
+        lines += ["", f"def {name}(value):", f"    return value * {i}"]
+    lines.append("```")
+    return "\n".join(lines)
+
+
+def long_list(rng: random.Random, items: int = 200, ordered: bool = False) -> str:
+    lines = []
+    for i in range(items):
+        prefix = f"{i % 9 + 1}. " if ordered else "- "
+        lines.append(prefix + emphasis_paragraph(rng, sentences=2))
+    return "\n".join(lines)
+
+
+def quote(rng: random.Random, lines: int = 20) -> str:
+    return "\n".join(f"> {sentence(rng)}" for _ in range(lines))
+
+
+def page(rng: random.Random, kind: str, index: int, scale: int = 1) -> str:
+    blocks = [f"# Page {index}: {sentence(rng, 4)}", emphasis_paragraph(rng)]
+    for section in range(3 * scale):
+        blocks.append(f"## Section {section}")
+        match kind:
+            case "code":
+                blocks.append(code_block(rng, functions=40 * scale))
+            case "list":
+                blocks.append(long_list(rng, items=100 * scale))
+                blocks.append(long_list(rng, items=50 * scale, ordered=True))
+            case "links":
+                blocks.append(link_paragraph(rng, links=40 * scale))
+            case "quote":
+                blocks.append(quote(rng, lines=20 * scale))
+            case _:
+                blocks += [emphasis_paragraph(rng) for _ in range(4)]
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_pages(
+    pages: int, seed: int = 0, depth: int = 4, scale: int = 1
+) -> list[tuple[str, str]]:
+    """Return `pages` (relative path, markdown) pairs spread over a directory
+    tree up to `depth` levels deep."""
+    rng = random.Random(seed)
+    result = []
+    for index in range(pages):
+        kind = KINDS[index % len(KINDS)]
+        levels = [
+            f"{rng.choice(WORDS)}-{rng.randrange(4)}" for _ in range(index % depth)
+        ]
+        path = os.path.join(*levels, f"page-{index}", "index.md")
+        result.append((path, page(rng, kind, index, scale)))
+    return result
+
+
+def write_corpus(root, pages: int, seed: int = 0, depth: int = 4, scale: int = 1):
+    for path, markdown in generate_pages(pages, seed, depth, scale):
+        full_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(markdown)
@@ -1,6 +1,3 @@
 #!/usr/bin/env bash
 
-uv run -m src.main
-
-cd public && python -m http.server 8888
-
+uv run -m src.serve
@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import marshal
+import os
+
+from src.block_md import PARSER_VERSION
+from src.htmlnode import FrozenNode, LeafNode, ParentNode
+
+logger = logging.getLogger(__name__)
+
+_LEAF = 0
+_PARENT = 1
+
+
+def encode_node(node) -> tuple:
+    if isinstance(node, FrozenNode):
+        node = node.node
+    props = dict(node.props) if node.props is not None else None
+    if isinstance(node, ParentNode):
+        children = tuple(encode_node(child) for child in node.children)
+        return (_PARENT, node.tag, props, children)
+    return (_LEAF, node.tag, props, node.value)
+
+
+def decode_node(data: tuple):
+    kind, tag, props, payload = data
+    if kind == _PARENT:
+        return ParentNode(tag, [decode_node(child) for child in payload], props)
+    return LeafNode(tag, payload, props)
+
+
+class ASTCache:
+    """Parsed documents stored on disk, keyed by markdown content hash.
+
+    Entries are marshalled `(title, tree)` tuples, one file per document.
+    Reading an entry refreshes its mtime, and once the directory grows past
+    `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    @staticmethod
+    def key(markdown_content: str) -> str:
+        digest = hashlib.sha256(f"{PARSER_VERSION}\0".encode())
+        digest.update(markdown_content.encode())
+        return digest.hexdigest()
+
+    def stats(self) -> tuple[int, int]:
+        return self.hits, self.misses
+
+    def add_stats(self, hits: int, misses: int):
+        """Fold in the counters of a cache that lived in a worker process."""
+        self.hits += hits
+        self.misses += misses
+
+    def _path(self, key) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Return the cached `(title, node)` for `key`, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                title, tree = marshal.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, EOFError, ValueError, TypeError):
+            logger.warning("dropping unreadable AST cache entry '%s'", path)
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return title, decode_node(tree)
+
+    def put(self, key, title: str, node):
+        path = self._path(key)
+        data = marshal.dumps((title, encode_node(node)))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        if self._size is None:
+            self._size = self._disk_usage()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until under 90% of the cap."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            self._remove(path)
+            size -= entry_size
+            evicted += 1
+        self._size = size
+        logger.debug("evicted %d AST cache entries", evicted)
+
+    def _disk_usage(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -1,11 +1,16 @@
 from enum import Enum
 import re
+from typing import Iterable, Iterator, NamedTuple
 
 from src.inline_md import text_to_textnodes
 from src.htmlnode import ParentNode
 from src.textnode import TextNode, TextType, text_node_to_html_node
 
 
+# Bump whenever a parser change alters the tree built from the same markdown,
+# so parse results cached by an older version are not reused.
+PARSER_VERSION = 2
+
 RE_HEADING = re.compile(r"^#{1,6}\s(.*)$", re.MULTILINE)
 RE_QUOTE = re.compile(r"^> ?(.*)$", re.MULTILINE)
 RE_UL_ITEM = re.compile(r"^[-*]\s(.*)$", re.MULTILINE)
@@ -22,84 +27,191 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
 
 
+class Block(NamedTuple):
+    text: str
+    start: int
+    end: int
+
+
 def md_to_blocks(markdown_text: str) -> list[str]:
-    raw_blocks = markdown_text.split("\n\n")
-    result = []
+    return [block.text for block in iter_blocks(markdown_text.split("\n"))]
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Block]:
+    """Split markdown lines into blocks in a single pass.
+
+    `lines` can be any iterable of lines, including an open file, and only the
+    block currently being collected is held in memory. Each `Block` carries
+    the zero-based range of source lines it came from, `end` exclusive.
+    Blank lines separate blocks except inside a ``` fence, which always forms
+    a block of its own.
+    """
     buffer = []
-    is_in_code_block = False
-    for block in raw_blocks:
-        if block.startswith("```"):
-            is_in_code_block = not is_in_code_block
-        if is_in_code_block:
-            buffer.append(block)
-            if block.endswith("```") and block != buffer[0]:
-                is_in_code_block = not is_in_code_block
-                full_code = "\n\n".join(buffer)
-                result.append(full_code.rstrip("\n"))
+    start = 0
+    in_fence = False
+    number = -1
+    for number, line in enumerate(lines):
+        line = line.rstrip("\r\n")
+        if in_fence:
+            buffer.append(line)
+            if line.startswith("```"):
+                in_fence = False
+                yield Block("\n".join(buffer), start, number + 1)
                 buffer = []
             continue
-        if not block:
+        if line.startswith("```"):
+            if buffer:
+                yield Block("\n".join(buffer).strip(), start, number)
+            in_fence = True
+            buffer = [line]
+            start = number
+            continue
+        if not line.strip():
+            if buffer:
+                yield Block("\n".join(buffer).strip(), start, number)
+                buffer = []
             continue
-        result.append(block.strip())
-    return result
+        if not buffer:
+            start = number
+        buffer.append(line)
+    if buffer:
+        text = "\n".join(buffer)
+        yield Block(text if in_fence else text.strip(), start, number + 1)
+
+
+class ParsedBlock(NamedTuple):
+    block_type: BlockType
+    lines: list[str]
+    level: int = 0
+
+
+def parse_block(block: str) -> ParsedBlock:
+    """Classify `block` and extract its content in one pass.
+
+    Dispatches on the first character, so each block is only checked
+    against the one type it can be. `lines` holds the cleaned content:
+    the heading text, the code lines, the quote lines, the list items or
+    the paragraph text.
+    """
+    parser = BLOCK_PARSERS.get(block[:1])
+    if parser is not None:
+        parsed = parser(block)
+        if parsed is not None:
+            return parsed
+    return ParsedBlock(BlockType.PARAGRAPH, [block.strip()])
+
+
+def _parse_heading(block: str) -> ParsedBlock | None:
+    level = 1
+    while level < 7 and block[level : level + 1] == "#":
+        level += 1
+    if level > 6 or block[level : level + 1] != " ":
+        return None
+    first_line = block.partition("\n")[0]
+    return ParsedBlock(BlockType.HEADING, [first_line[level + 1 :]], level)
+
+
+def _parse_code(block: str) -> ParsedBlock | None:
+    lines = block.split("\n")
+    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+        return ParsedBlock(BlockType.CODE, lines[1:-1])
+    return None
+
+
+def _parse_quote(block: str) -> ParsedBlock | None:
+    if not block.startswith("> "):
+        return None
+    lines = []
+    for line in block.split("\n"):
+        if not line.startswith(">"):
+            return None
+        lines.append(line[1:].strip())
+    return ParsedBlock(BlockType.QUOTE, lines)
+
+
+def _parse_unordered_list(block: str) -> ParsedBlock | None:
+    items = []
+    for line in block.split("\n"):
+        if not line.startswith("- "):
+            return None
+        items.append(line[2:])
+    return ParsedBlock(BlockType.UNORDERED_LIST, items)
+
+
+def _parse_ordered_list(block: str) -> ParsedBlock | None:
+    items = []
+    for line in block.split("\n"):
+        if line[:1] not in ORDERED_DIGITS or line[1:3] != ". ":
+            return None
+        items.append(line[3:])
+    return ParsedBlock(BlockType.ORDERED_LIST, items)
+
+
+ORDERED_DIGITS = frozenset("123456789")
+
+BLOCK_PARSERS = {
+    "#": _parse_heading,
+    "`": _parse_code,
+    ">": _parse_quote,
+    "-": _parse_unordered_list,
+    **{digit: _parse_ordered_list for digit in ORDERED_DIGITS},
+}
 
 
 def block_to_block_type(block: str) -> BlockType:
-    lines = block.split("\n")
-    if block.startswith("#"):
-        count = len(block) - len(block.lstrip("#"))
-        if 1 <= count <= 6 and block[count : count + 1] == " ":
-            return BlockType.HEADING
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
-        return BlockType.CODE
-    if block.startswith("> ") and all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE
-    if block.startswith("- ") and all(line.startswith("- ") for line in lines):
-        return BlockType.UNORDERED_LIST
-    ordered_prefixes = tuple(f"{i}. " for i in range(1, 10))
-    if block.startswith(ordered_prefixes) and all(
-        line.startswith(ordered_prefixes) for line in lines
-    ):
-        return BlockType.ORDERED_LIST
-    return BlockType.PARAGRAPH
+    return parse_block(block).block_type
 
 
 def md_to_html_node(markdown_text: str) -> ParentNode:
     children = []
-    blocks = md_to_blocks(markdown_text)
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        html_node = block_to_html_node(block_type, block)
-        children.append(html_node)
+    for block in md_to_blocks(markdown_text):
+        children.append(parsed_block_to_html_node(parse_block(block)))
     return ParentNode(tag="div", children=children, props=None)
 
 
 def block_to_html_node(block_type: BlockType, block_text: str) -> ParentNode:
+    parsed = parse_block(block_text)
+    if parsed.block_type != block_type:
+        parsed = _parse_as(block_type, block_text)
+    return parsed_block_to_html_node(parsed)
+
+
+def _parse_as(block_type: BlockType, block_text: str) -> ParsedBlock:
+    # Only reached when a caller forces a type the block does not look like.
     match block_type:
-        case BlockType.HEADING:
+        case BlockType.UNORDERED_LIST:
+            return ParsedBlock(block_type, RE_UL_ITEM.findall(block_text))
+        case BlockType.ORDERED_LIST:
+            return ParsedBlock(block_type, RE_OL_ITEM.findall(block_text))
+        case _:
             level = len(block_text) - len(block_text.lstrip("#"))
             text = clean_block_text(block_type, block_text)
-            children = text_to_children(text)
-            return ParentNode(tag=f"h{level}", children=children)
+            return ParsedBlock(block_type, [text], level)
+
+
+def parsed_block_to_html_node(parsed: ParsedBlock) -> ParentNode:
+    match parsed.block_type:
+        case BlockType.HEADING:
+            children = text_to_children(parsed.lines[0])
+            return ParentNode(tag=f"h{parsed.level}", children=children)
         case BlockType.CODE:
-            text = clean_block_text(block_type, block_text)
-            code_node = TextNode(text=text, text_type=TextType.CODE)
+            code_node = TextNode(text="\n".join(parsed.lines), text_type=TextType.CODE)
             return ParentNode(tag="pre", children=[text_node_to_html_node(code_node)])
         case BlockType.UNORDERED_LIST:
-            items = RE_UL_ITEM.findall(block_text)
-            list_nodes = [ParentNode("li", text_to_children(item)) for item in items]
+            list_nodes = [
+                ParentNode("li", text_to_children(item)) for item in parsed.lines
+            ]
             return ParentNode(tag="ul", children=list_nodes)
         case BlockType.ORDERED_LIST:
-            items = RE_OL_ITEM.findall(block_text)
-            list_nodes = [ParentNode("li", text_to_children(item)) for item in items]
+            list_nodes = [
+                ParentNode("li", text_to_children(item)) for item in parsed.lines
+            ]
             return ParentNode(tag="ol", children=list_nodes)
         case BlockType.QUOTE:
-            text = clean_block_text(block_type, block_text)
-            children = text_to_children(text)
+            children = text_to_children("\n".join(parsed.lines))
             return ParentNode(tag="blockquote", children=children)
         case _:
-            text = clean_block_text(block_type, block_text)
-            children = text_to_children(text)
+            children = text_to_children("\n".join(parsed.lines))
             return ParentNode(tag="p", children=children)
 
 
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+
+from src.block_md import ParsedBlock, parsed_block_to_html_node
+from src.htmlnode import FrozenNode
+
+
+class BlockCache:
+    """Rendered blocks shared between pages, keyed by block type and text.
+
+    Blocks that repeat across the site (disclaimers, navigation lists,
+    boilerplate quotes) are converted and serialized once. Entries are
+    `FrozenNode`s, so handing the same one to several pages is safe. The
+    cache is bounded by the total length of the cached HTML and drops the
+    least recently used blocks first. Fragments are serialized with
+    `resolver`, the URL resolver of the build.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, resolver=None):
+        self.max_bytes = max_bytes
+        self.resolver = resolver
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries: OrderedDict[tuple, FrozenNode] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def render(self, block: str, parsed: ParsedBlock) -> FrozenNode:
+        key = (parsed.block_type, block)
+        node = self._entries.get(key)
+        if node is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return node
+        self.misses += 1
+        node = FrozenNode(parsed_block_to_html_node(parsed), self.resolver)
+        self._entries[key] = node
+        self.size += _entry_size(key, node)
+        while self.size > self.max_bytes and self._entries:
+            old_key, old_node = self._entries.popitem(last=False)
+            self.size -= _entry_size(old_key, old_node)
+        return node
+
+    def stats(self) -> tuple[int, int]:
+        return self.hits, self.misses
+
+    def add_stats(self, hits: int, misses: int):
+        """Fold in the counters of a cache that lived in a worker process."""
+        self.hits += hits
+        self.misses += misses
+
+
+def _entry_size(key, node: FrozenNode) -> int:
+    return len(key[1]) + len(node.html)
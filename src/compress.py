@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import logging
+import os
+import shutil
+
+from src.manifest import BuildManifest, hash_file
+
+logger = logging.getLogger(__name__)
+
+# Pages are numerous and rebuilt often, assets rarely change and are fetched
+# on every page view, so they get the slowest, smallest setting.
+DEFAULT_LEVELS = {
+    ".html": 6,
+    ".css": 9,
+    ".js": 9,
+    ".svg": 9,
+    ".json": 9,
+    ".xml": 9,
+    ".txt": 9,
+}
+
+
+def parse_levels(specs) -> dict[str, int]:
+    """Apply `EXT=LEVEL` overrides (e.g. `.html=9`, `css=4`) to the default
+    compression levels. Level 0 disables compression for that type."""
+    levels = dict(DEFAULT_LEVELS)
+    for spec in specs:
+        extension, _, level = spec.partition("=")
+        if not level.isdigit() or not 0 <= int(level) <= 9:
+            raise ValueError(f"invalid compression level '{spec}', expected EXT=0-9")
+        levels["." + extension.strip().lstrip(".").lower()] = int(level)
+    return {extension: level for extension, level in levels.items() if level > 0}
+
+
+def compress_outputs(
+    paths,
+    manifest: BuildManifest | None = None,
+    levels: dict[str, int] = DEFAULT_LEVELS,
+    jobs: int = 1,
+):
+    """Write a gzip sibling (`page.html.gz`) next to every file in `paths`
+    whose extension has a compression level.
+
+    Files are hashed and compressed on a pool of `jobs` threads; zlib and
+    hashlib release the GIL, so the work runs in parallel. With a `manifest`,
+    a file whose size and mtime, or else whose content hash, and level match
+    the previous build keeps its existing `.gz`, and the `.gz` of outputs
+    that no longer exist are removed.
+    """
+    stats = {"compressed": 0, "unchanged": 0, "removed": 0}
+    targets = []
+    for path in paths:
+        level = levels.get(os.path.splitext(path)[1].lower())
+        if level is not None and os.path.isfile(path):
+            targets.append((str(path), level))
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        results = executor.map(lambda target: _compress(*target, manifest), targets)
+        for (path, level), (compressed, digest, stat) in zip(targets, results):
+            if manifest is not None and digest is not None:
+                manifest.record_compressed(path, level, digest, stat)
+            if not compressed:
+                stats["unchanged"] += 1
+                continue
+            logger.debug("compressed '%s' at level %d.", path, level)
+            stats["compressed"] += 1
+
+    if manifest is not None:
+        for removed in manifest.prune_compressed({path for path, _ in targets}):
+            _remove(removed + ".gz")
+            stats["removed"] += 1
+    logger.info(
+        "compress: %d compressed, %d unchanged, %d removed.",
+        stats["compressed"],
+        stats["unchanged"],
+        stats["removed"],
+    )
+    return stats
+
+
+def remove_compressed(manifest: BuildManifest) -> int:
+    """Delete every `.gz` recorded in `manifest`, for builds without
+    compression, so no stale sibling is served in place of a newer file."""
+    removed = manifest.prune_compressed(set())
+    for path in removed:
+        _remove(path + ".gz")
+    if removed:
+        logger.info("compress: %d removed.", len(removed))
+    return len(removed)
+
+
+def compress_file(path, level: int):
+    """Write `path.gz` atomically. The gzip header carries no timestamp or
+    name, so the same input always produces the same bytes."""
+    tmp_path = f"{path}.gz.tmp"
+    with open(path, "rb") as src, open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(
+            filename="", mode="wb", compresslevel=level, fileobj=raw, mtime=0
+        ) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(tmp_path, f"{path}.gz")
+
+
+def _compress(path, level, manifest):
+    # Returns (compressed, digest, stat); digest is None when the stat alone
+    # showed the file unchanged and there is nothing new to record.
+    stat = os.stat(path)
+    entry = manifest.compressed.get(path) if manifest is not None else None
+    fresh = (
+        entry is not None and entry["level"] == level and os.path.exists(path + ".gz")
+    )
+    if (
+        fresh
+        and entry["size"] == stat.st_size
+        and entry["mtime_ns"] == stat.st_mtime_ns
+    ):
+        return False, None, stat
+    digest = hash_file(path)
+    if fresh and entry["hash"] == digest:
+        return False, digest, stat
+    compress_file(path, level)
+    return True, digest, stat
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,23 +1,157 @@
+import json
+import logging
 import os
 import shutil
 
+from src.manifest import BuildManifest, hash_file, write_if_changed
 
-def copy_static_content(source, dest):
+logger = logging.getLogger(__name__)
+
+ASSET_MANIFEST = "assets.json"
+FINGERPRINT_LENGTH = 10
+
+
+def copy_static_content(
+    source,
+    dest,
+    manifest: BuildManifest | None = None,
+    checksum: bool = False,
+    link: bool = False,
+    fingerprints: dict[str, str] | None = None,
+):
+    """Sync `source` into `dest`, skipping files that are already up to date.
+
+    A file is unchanged when size and mtime match (or, with `checksum`, when
+    the contents hash the same). With `link`, files are hardlinked instead of
+    copied where the filesystem allows it. Files synced by a previous build
+    whose source is gone are removed when a `manifest` is given.
+
+    When a `fingerprints` dict is passed, every file is synced as
+    `name.<hash>.ext` instead and the dict is filled with the URL of each
+    original file mapped to the URL of its copy, which is also written to
+    `dest/assets.json`. The manifest keeps the hashes, so only files whose
+    size or mtime changed are hashed again, and records `assets.json` like
+    a synced file, so it is removed once fingerprinting is turned off.
+    """
+    stats = {"copied": 0, "unchanged": 0, "removed": 0}
+    _sync_directory(source, dest, manifest, checksum, link, stats, fingerprints, "/")
+    if fingerprints is not None:
+        asset_manifest = os.path.join(dest, ASSET_MANIFEST)
+        content = json.dumps(dict(sorted(fingerprints.items())), indent=2)
+        write_if_changed(asset_manifest, content)
+        if manifest is not None:
+            manifest.record_asset(source, asset_manifest)
+    if manifest is not None:
+        for removed in manifest.prune_assets():
+            logger.info("removed '%s', it no longer exists in '%s/'.", removed, source)
+            stats["removed"] += 1
+    logger.info(
+        "static sync: %d copied, %d unchanged, %d removed.",
+        stats["copied"],
+        stats["unchanged"],
+        stats["removed"],
+    )
+    return stats
+
+
+def _sync_directory(source, dest, manifest, checksum, link, stats, fingerprints, url):
     if not os.path.exists(dest):
-        print(f"INFO: create a clean '{dest}/' directory")
+        logger.info("create a clean '%s/' directory", dest)
         os.mkdir(dest)
 
-    if os.path.exists(source):
-        files = os.listdir(source)
-        print(f"DEBUG: content from source '{source}/':\n\t{files}")
-        for file in files:
-            new_source_path = os.path.join(source, file)
-            new_dest_path = os.path.join(dest, file)
-
-            if os.path.isfile(new_source_path):
-                print(f"INFO:\t{new_source_path} -> {new_dest_path} ")
-                shutil.copy(new_source_path, dest)
-                print(f"DEBUG: content at destination {dest}:\n\t{os.listdir(dest)}")
+    if not os.path.exists(source):
+        return
+
+    for file in sorted(os.listdir(source)):
+        new_source_path = os.path.join(source, file)
+        new_dest_path = os.path.join(dest, file)
+
+        if not os.path.isfile(new_source_path):
+            _sync_directory(
+                new_source_path,
+                new_dest_path,
+                manifest,
+                checksum,
+                link,
+                stats,
+                fingerprints,
+                f"{url}{file}/",
+            )
+            continue
+
+        if fingerprints is not None:
+            if manifest is not None:
+                digest = manifest.asset_hash(new_source_path)
             else:
-                print(f"INFO: moving into nested '{new_dest_path}/' path.")
-                copy_static_content(new_source_path, new_dest_path)
+                digest = hash_file(new_source_path)
+            name = fingerprint_name(file, digest)
+            new_dest_path = os.path.join(dest, name)
+            fingerprints[url + file] = url + name
+
+        if manifest is not None:
+            manifest.record_asset(new_source_path, new_dest_path)
+        if _is_unchanged(new_source_path, new_dest_path, checksum):
+            stats["unchanged"] += 1
+            continue
+        logger.debug("%s -> %s", new_source_path, new_dest_path)
+        if os.path.lexists(new_dest_path):
+            # The old file may be a hardlink to the source, never write into it.
+            os.remove(new_dest_path)
+        if not (link and _try_link(new_source_path, new_dest_path)):
+            _copy_file(new_source_path, new_dest_path)
+        stats["copied"] += 1
+
+
+def fingerprint_name(name: str, digest: str) -> str:
+    """`index.css` with content hash `digest` becomes `index.<hash>.css`."""
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def _is_unchanged(source, dest, checksum) -> bool:
+    try:
+        dest_stat = os.stat(dest)
+    except FileNotFoundError:
+        return False
+    source_stat = os.stat(source)
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if source_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    if checksum and hash_file(source) == hash_file(dest):
+        os.utime(dest, ns=(dest_stat.st_atime_ns, source_stat.st_mtime_ns))
+        return True
+    return False
+
+
+def _try_link(source, dest) -> bool:
+    try:
+        os.link(source, dest)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_file(source, dest):
+    # copy_file_range lets the kernel copy (or reflink) without bouncing the
+    # data through userspace; shutil.copyfile already falls back to sendfile.
+    copied = False
+    if hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(source, dest)
+            copied = True
+        except OSError:
+            pass
+    if not copied:
+        shutil.copyfile(source, dest)
+    shutil.copystat(source, dest)
+
+
+def _copy_file_range(source, dest):
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            sent = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if sent == 0:
+                break
+            remaining -= sent
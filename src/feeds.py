@@ -0,0 +1,218 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+import filecmp
+import heapq
+import logging
+import os
+import re
+from xml.sax.saxutils import escape
+
+from src.manifest import write_if_changed
+from src.metadata import timestamp_ns
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_MAX_URLS = 50_000
+SITEMAP_NAME = "sitemap.xml"
+
+RE_SITEMAP_PART = re.compile(r"sitemap-\d+\.xml")
+
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+_SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+_ATOM_NS = "http://www.w3.org/2005/Atom"
+
+
+def _datetime(mtime_ns: int) -> datetime:
+    return datetime.fromtimestamp(mtime_ns // 1_000_000_000, timezone.utc)
+
+
+def w3c_datetime(mtime_ns: int) -> str:
+    return _datetime(mtime_ns).isoformat()
+
+
+class SitemapWriter:
+    """Page sink that streams URLs into `sitemap.xml` as pages are added.
+
+    URLs go straight to disk, so memory use does not grow with the site.
+    Past `max_urls` entries the sitemap is split into `sitemap-N.xml` parts
+    and `sitemap.xml` becomes the index listing them. `url` is where
+    `directory` is served from and `site_url` the scheme and host in front
+    of it. Files whose content did not change are left alone.
+    """
+
+    def __init__(self, directory, url: str, site_url: str, max_urls=SITEMAP_MAX_URLS):
+        self.directory = directory
+        self.url = url
+        self.site_url = site_url.rstrip("/")
+        self.max_urls = max_urls
+        self.outputs: list[str] = []
+        self._parts: list[str] = []
+        self._file = None
+        self._count = 0
+
+    def add(self, source, url: str, title: str, mtime_ns: int, metadata=None):
+        if self._file is None or self._count == self.max_urls:
+            self._start_part()
+        loc = escape(self.site_url + url)
+        self._file.write(
+            f"<url><loc>{loc}</loc><lastmod>{w3c_datetime(mtime_ns)}</lastmod></url>\n"
+        )
+        self._count += 1
+
+    def close(self) -> int:
+        """Finish the sitemap and return the number of files written or
+        removed."""
+        if self._file is None:
+            self._start_part()
+        self._finish_part()
+        written = 0
+        sitemap = os.path.join(self.directory, SITEMAP_NAME)
+        if len(self._parts) == 1:
+            written += _replace_if_changed(self._parts[0], sitemap)
+            self.outputs = [sitemap]
+        else:
+            self.outputs = []
+            with open(f"{sitemap}.tmp", "w") as f:
+                f.write(_XML_DECLARATION)
+                f.write(f'<sitemapindex xmlns="{_SITEMAP_NS}">\n')
+                for number, part in enumerate(self._parts, 1):
+                    path = os.path.join(self.directory, f"sitemap-{number}.xml")
+                    written += _replace_if_changed(part, path)
+                    self.outputs.append(path)
+                    loc = escape(f"{self.site_url}{self.url}sitemap-{number}.xml")
+                    f.write(f"<sitemap><loc>{loc}</loc></sitemap>\n")
+                f.write("</sitemapindex>\n")
+            written += _replace_if_changed(f"{sitemap}.tmp", sitemap)
+            self.outputs.append(sitemap)
+        keep = {os.path.basename(path) for path in self.outputs}
+        for name in os.listdir(self.directory):
+            if RE_SITEMAP_PART.fullmatch(name) and name not in keep:
+                os.remove(os.path.join(self.directory, name))
+                written += 1
+        logger.info(
+            "sitemap: %d file(s), %d file(s) updated.", len(self.outputs), written
+        )
+        return written
+
+    def _start_part(self):
+        if self._file is not None:
+            self._finish_part()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"sitemap-{len(self._parts) + 1}.xml.tmp")
+        self._parts.append(path)
+        self._file = open(path, "w")
+        self._file.write(_XML_DECLARATION)
+        self._file.write(f'<urlset xmlns="{_SITEMAP_NS}">\n')
+        self._count = 0
+
+    def _finish_part(self):
+        self._file.write("</urlset>\n")
+        self._file.close()
+        self._file = None
+
+
+class FeedWriter:
+    """Page sink writing `atom.xml` and `rss.xml` for one content section.
+
+    Only pages below `source_dir`, other than its own `index.md`, are
+    entries. Just the `limit` most recent ones are kept while pages are
+    added, dated by their front matter `date` or else their mtime. The
+    feeds are written into `directory`, served at `url`, when `close` is
+    called.
+    """
+
+    def __init__(
+        self,
+        source_dir,
+        directory,
+        url: str,
+        site_url: str,
+        title: str | None = None,
+        limit: int = 20,
+    ):
+        self.source_dir = os.path.normpath(source_dir)
+        self.directory = directory
+        self.url = url
+        self.site_url = site_url.rstrip("/")
+        self.title = title or os.path.basename(self.source_dir).capitalize()
+        self.limit = limit
+        self.outputs: list[str] = []
+        self._index = os.path.join(self.source_dir, "index.md")
+        self._entries: list[tuple[int, str, str]] = []
+
+    def add(self, source, url: str, title: str, mtime_ns: int, metadata=None):
+        source = os.path.normpath(source)
+        if not source.startswith(self.source_dir + os.sep) or source == self._index:
+            return
+        if metadata and "date" in metadata:
+            mtime_ns = timestamp_ns(metadata["date"]) or mtime_ns
+        entry = (mtime_ns, url, title)
+        if len(self._entries) < self.limit:
+            heapq.heappush(self._entries, entry)
+        else:
+            heapq.heappushpop(self._entries, entry)
+
+    def close(self) -> int:
+        """Write the feeds and return the number of files that changed."""
+        entries = sorted(self._entries, reverse=True)
+        updated = entries[0][0] if entries else 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.outputs = [
+            os.path.join(self.directory, "atom.xml"),
+            os.path.join(self.directory, "rss.xml"),
+        ]
+        written = write_if_changed(self.outputs[0], self._atom(entries, updated))
+        written += write_if_changed(self.outputs[1], self._rss(entries, updated))
+        logger.info(
+            "feeds for '%s': %d entries, %d file(s) updated.",
+            self.source_dir,
+            len(entries),
+            written,
+        )
+        return written
+
+    def _atom(self, entries, updated) -> str:
+        link = escape(self.site_url + self.url)
+        lines = [
+            _XML_DECLARATION + f'<feed xmlns="{_ATOM_NS}">',
+            f"<title>{escape(self.title)}</title>",
+            f'<link href="{link}"/>',
+            f'<link rel="self" href="{link}atom.xml"/>',
+            f"<id>{link}</id>",
+            f"<updated>{w3c_datetime(updated)}</updated>",
+        ]
+        for mtime_ns, url, title in entries:
+            loc = escape(self.site_url + url)
+            lines.append(
+                f'<entry><title>{escape(title)}</title><link href="{loc}"/>'
+                f"<id>{loc}</id><updated>{w3c_datetime(mtime_ns)}</updated></entry>"
+            )
+        lines.append("</feed>\n")
+        return "\n".join(lines)
+
+    def _rss(self, entries, updated) -> str:
+        link = escape(self.site_url + self.url)
+        lines = [
+            _XML_DECLARATION + '<rss version="2.0"><channel>',
+            f"<title>{escape(self.title)}</title>",
+            f"<link>{link}</link>",
+            f"<description>{escape(self.title)}</description>",
+            f"<lastBuildDate>{format_datetime(_datetime(updated))}</lastBuildDate>",
+        ]
+        for mtime_ns, url, title in entries:
+            loc = escape(self.site_url + url)
+            lines.append(
+                f"<item><title>{escape(title)}</title><link>{loc}</link>"
+                f"<guid>{loc}</guid>"
+                f"<pubDate>{format_datetime(_datetime(mtime_ns))}</pubDate></item>"
+            )
+        lines.append("</channel></rss>\n")
+        return "\n".join(lines)
+
+
+def _replace_if_changed(tmp_path, path) -> int:
+    if os.path.exists(path) and filecmp.cmp(tmp_path, path, shallow=False):
+        os.remove(tmp_path)
+        return 0
+    os.replace(tmp_path, path)
+    return 1
@@ -1,7 +1,13 @@
+from types import MappingProxyType
 from typing import Dict, List
 
+# Attributes whose values are URLs and go through the resolver.
+URL_PROPS = frozenset(("href", "src"))
+
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str | None = None,
@@ -14,15 +20,27 @@ class HTMLNode:
         self.children = children
         self.props = props
 
-    def to_html(self):
-        raise NotImplementedError("to_html method not implemented")
+    def iter_html(self, resolver=None):
+        raise NotImplementedError("iter_html method not implemented")
+
+    def to_html(self, resolver=None) -> str:
+        return "".join(self.iter_html(resolver))
+
+    def write_html(self, fp, resolver=None):
+        fp.writelines(self.iter_html(resolver))
 
-    def props_to_html(self):
+    def props_to_html(self, resolver=None):
         if self.props is None:
             return ""
         html_strings = []
-        for prop in self.props:
-            html_strings.append(f'{prop}="{self.props[prop]}"')
+        for prop, value in self.props.items():
+            if resolver is not None and prop in URL_PROPS:
+                value = resolver.resolve(value)
+            html_strings.append(f'{prop}="{value}"')
+        if resolver is not None and self.tag == "img" and "width" not in self.props:
+            size = resolver.image_size(self.props.get("src", ""))
+            if size is not None:
+                html_strings.append(f'width="{size[0]}" height="{size[1]}"')
         return " " + " ".join(html_strings)
 
     def __repr__(self) -> str:
@@ -30,6 +48,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str | None,
@@ -38,18 +58,23 @@ class LeafNode(HTMLNode):
     ):
         super().__init__(tag=tag, value=value, children=None, props=props)
 
-    def to_html(self) -> str:
+    def iter_html(self, resolver=None):
         if self.value is None:
             raise ValueError("Invalid HTML: no value")
         if self.tag is None:
-            return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            yield self.value
+            return
+        yield f"<{self.tag}{self.props_to_html(resolver)}>"
+        yield self.value
+        yield f"</{self.tag}>"
 
     def __repr__(self):
         return f"LeafNode(tag={self.tag}, value={self.value}, props={self.props})"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
@@ -58,16 +83,100 @@ class ParentNode(HTMLNode):
     ):
         super().__init__(tag=tag, value=None, children=children, props=props)
 
-    def to_html(self) -> str:
+    def iter_html(self, resolver=None):
         if self.tag is None:
             raise ValueError("Invalid HTML: no tag")
         if self.children is None:
             raise ValueError("Invalid HTML: no children")
-        html_string = ""
+        yield f"<{self.tag}{self.props_to_html(resolver)}>"
         for child in self.children:
-            html_string += child.to_html()
-
-        return f"<{self.tag}{self.props_to_html()}>{html_string}</{self.tag}>"
+            yield from child.iter_html(resolver)
+        yield f"</{self.tag}>"
 
     def __repr__(self):
         return f"ParentNode(tag={self.tag}, children={repr(self.children)}, props={self.props})"
+
+
+class FrozenNode(HTMLNode):
+    """A rendered subtree that can be shared between documents.
+
+    The HTML is serialized once, up front, with `resolver`; serializing with
+    any other resolver falls back to walking the subtree. Children become
+    tuples and props read-only mappings, and the node and every node below
+    it reject attribute assignment, so no page can change a fragment
+    another page is using.
+    """
+
+    __slots__ = ("node", "resolver", "html")
+
+    def __init__(self, node: HTMLNode, resolver=None):
+        _freeze(node)
+        object.__setattr__(self, "tag", node.tag)
+        object.__setattr__(self, "value", node.value)
+        object.__setattr__(self, "children", node.children)
+        object.__setattr__(self, "props", node.props)
+        object.__setattr__(self, "node", node)
+        object.__setattr__(self, "resolver", resolver)
+        object.__setattr__(self, "html", node.to_html(resolver))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"FrozenNode is immutable, cannot set '{name}'")
+
+    def iter_html(self, resolver=None):
+        if resolver == self.resolver:
+            yield self.html
+        else:
+            yield from self.node.iter_html(resolver)
+
+    def __repr__(self):
+        return f"FrozenNode({self.node!r})"
+
+
+def node_urls(node: HTMLNode, urls: set | None = None) -> set[str]:
+    """The `href`/`src` values of a tree, as written in the source."""
+    if urls is None:
+        urls = set()
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, FrozenNode):
+            node = node.node
+        if node.props:
+            urls.update(node.props[prop] for prop in URL_PROPS if prop in node.props)
+        if node.children is not None:
+            pending.extend(node.children)
+    return urls
+
+
+def _reject_assignment(self, name, value):
+    raise AttributeError(f"{self.tag!r} node is frozen, cannot set '{name}'")
+
+
+class _FrozenLeafNode(LeafNode):
+    __slots__ = ()
+    __setattr__ = _reject_assignment
+
+
+class _FrozenParentNode(ParentNode):
+    __slots__ = ()
+    __setattr__ = _reject_assignment
+
+
+_FROZEN_TYPES = {LeafNode: _FrozenLeafNode, ParentNode: _FrozenParentNode}
+
+
+def _freeze(node: HTMLNode):
+    # Nodes are frozen in place by switching them to a read-only subclass
+    # with the same slots, so the shared tree is never copied.
+    if isinstance(node, (FrozenNode, _FrozenLeafNode, _FrozenParentNode)):
+        return
+    frozen_type = _FROZEN_TYPES.get(type(node))
+    if frozen_type is None:
+        raise TypeError(f"cannot freeze a {type(node).__name__}")
+    if node.props is not None:
+        node.props = MappingProxyType(dict(node.props))
+    if node.children is not None:
+        for child in node.children:
+            _freeze(child)
+        node.children = tuple(node.children)
+    node.__class__ = frozen_type
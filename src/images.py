@@ -0,0 +1,120 @@
+import logging
+import os
+import struct
+
+from src.manifest import load_json_state, save_json_state
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIZES_VERSION = 1
+
+IMAGE_EXTENSIONS = frozenset((".png", ".gif", ".jpg", ".jpeg"))
+
+# JPEG start-of-frame markers carry the dimensions; C4, C8 and CC are other
+# segments sharing the range.
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_size(path) -> tuple[int, int] | None:
+    """Read the `(width, height)` of a PNG, GIF or JPEG from its header.
+
+    Only the first bytes of PNG and GIF files are read. JPEG segments are
+    skipped with seeks until the frame header. Returns None for anything
+    unrecognised or truncated.
+    """
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"\xff\xd8"):
+            return _jpeg_size(f)
+    return None
+
+
+def _jpeg_size(f) -> tuple[int, int] | None:
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        while marker[1] == 0xFF:
+            # Markers may be preceded by fill bytes.
+            marker = marker[1:] + f.read(1)
+            if len(marker) < 2:
+                return None
+        if marker[1] == 0x01 or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if marker[1] in _JPEG_SOF:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+class ImageSizeIndex:
+    """Dimensions of the images under a static directory, kept between builds.
+
+    Entries are keyed by path and hold the size and mtime the image had when
+    it was probed, so on a warm build every image costs one stat and only
+    new or modified files have their headers read.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.images: dict[str, list] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "ImageSizeIndex":
+        index = cls(path)
+        data = load_json_state(path, IMAGE_SIZES_VERSION, "image size index")
+        if data is not None:
+            index.images = data["images"]
+        return index
+
+    def save(self):
+        save_json_state(self.path, IMAGE_SIZES_VERSION, {"images": self.images})
+
+    def scan(self, directory) -> dict[str, tuple[int, int]]:
+        """Map the site URL of every image under `directory` to its
+        dimensions, and forget images that are gone."""
+        sizes = {}
+        images = {}
+        probed = 0
+        pending = [(directory, "/")]
+        while pending:
+            root, url = pending.pop()
+            try:
+                entries = os.scandir(root)
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        pending.append((entry.path, f"{url}{entry.name}/"))
+                        continue
+                    extension = os.path.splitext(entry.name)[1].lower()
+                    if extension not in IMAGE_EXTENSIONS:
+                        continue
+                    stat = entry.stat()
+                    record = self.images.get(entry.path)
+                    if record is None or record[:2] != [stat.st_size, stat.st_mtime_ns]:
+                        try:
+                            size = image_size(entry.path)
+                        except OSError as e:
+                            logger.warning("cannot read image '%s': %s", entry.path, e)
+                            continue
+                        record = [stat.st_size, stat.st_mtime_ns, size]
+                        probed += 1
+                    images[entry.path] = record
+                    if record[2] is not None:
+                        sizes[url + entry.name] = tuple(record[2])
+        self.images = images
+        logger.info("image sizes: %d image(s), %d probed.", len(images), probed)
+        return sizes
@@ -2,6 +2,17 @@ import re
 from src.textnode import TextNode, TextType
 
 
+RE_IMAGE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+RE_LINK = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+RE_INLINE_TOKEN = re.compile(r"\*\*|[_`]|!?\[")
+
+INLINE_DELIMITERS = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
     for old_node in old_nodes:
@@ -24,7 +35,7 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
 
 def extract_markdown_images(text):
-    matches = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    matches = RE_IMAGE.findall(text)
     return matches
 
 
@@ -90,10 +101,56 @@ def split_nodes_link(old_nodes):
 
 
 def text_to_textnodes(text):
-    nodes = [TextNode(text=text, text_type=TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    """Tokenize inline markdown in a single left-to-right scan.
+
+    Produces the same node stream as chaining `split_nodes_delimiter` for
+    `**`, `_` and `` ` `` followed by `split_nodes_image` and
+    `split_nodes_link`, but each character is looked at a bounded number of
+    times instead of once per pass and once per extracted link.
+    """
+    nodes = []
+    text_start = 0
+    position = 0
+    # Plain text that is a whole section between two delimiters is dropped
+    # when it is empty or a lone newline, like `split_nodes_delimiter` does.
+    section_has_reference = False
+    while (match := RE_INLINE_TOKEN.search(text, position)) is not None:
+        token = match.group()
+        text_type = INLINE_DELIMITERS.get(token)
+        if text_type is not None:
+            end = text.find(token, match.end())
+            if end == -1:
+                raise ValueError(
+                    "Invalid markdown syntax, formatted section not closed"
+                )
+            _append_text(nodes, text[text_start : match.start()], section_has_reference)
+            inner = text[match.end() : end]
+            if inner not in ["", "\n"]:
+                nodes.append(TextNode(inner, text_type))
+            position = text_start = end + len(token)
+            section_has_reference = False
+            continue
+
+        if token == "![":
+            reference = RE_IMAGE.match(text, match.start())
+            text_type = TextType.IMAGE
+        else:
+            reference = RE_LINK.match(text, match.start())
+            text_type = TextType.LINK
+        if reference is None:
+            position = match.end()
+            continue
+        if match.start() > text_start:
+            nodes.append(TextNode(text[text_start : match.start()], TextType.TEXT))
+        nodes.append(TextNode(reference.group(1), text_type, reference.group(2)))
+        position = text_start = reference.end()
+        section_has_reference = True
+
+    _append_text(nodes, text[text_start:], section_has_reference)
     return nodes
+
+
+def _append_text(nodes, text, keep_newline):
+    if text == "" or (text == "\n" and not keep_newline):
+        return
+    nodes.append(TextNode(text, TextType.TEXT))
@@ -0,0 +1,226 @@
+from datetime import datetime, timezone
+import hashlib
+import json
+import logging
+import os
+import re
+
+from src.htmlnode import LeafNode, ParentNode
+from src.manifest import hash_file, load_json_state, save_json_state
+from src.metadata import timestamp_ns
+from src.template import find_layout, load_template
+from src.urls import UrlResolver
+
+logger = logging.getLogger(__name__)
+
+LISTINGS_VERSION = 1
+
+RE_SLUG = re.compile(r"[^\w]+")
+
+
+def tag_slug(tag: str) -> str:
+    return RE_SLUG.sub("-", tag.lower()).strip("-")
+
+
+def _date(timestamp_ns: int) -> str:
+    seconds = timestamp_ns // 1_000_000_000
+    return datetime.fromtimestamp(seconds, timezone.utc).date().isoformat()
+
+
+class ListingWriter:
+    """Page sink generating paginated listing pages for content sections
+    and tags.
+
+    Pages below `content_dir/<section>/` (other than its `index.md`) are
+    listed at `/<section>/`, and pages with front matter `tags` at
+    `/tags/<tag>/`, newest first by their front matter `date` or mtime.
+    Further pages of `per_page` entries go to `.../page/N/`.
+
+    On `close` the entries are sorted in a single pass and dealt out to
+    their collections in that order. A listing page is only rendered when
+    its digest (entries, position, template files, the assets they
+    reference and basepath) differs from the one recorded in `state_path`
+    by the previous build, and listing pages that are no longer needed are
+    removed.
+    """
+
+    def __init__(
+        self,
+        content_dir,
+        dest_dir,
+        template_path,
+        resolver: UrlResolver,
+        state_path: str | None = None,
+        sections=("blog",),
+        per_page: int = 10,
+        partials_dir=None,
+    ):
+        self.content_dir = os.path.normpath(content_dir)
+        self.dest_dir = dest_dir
+        self.template_path = template_path
+        self.resolver = resolver
+        self.state_path = state_path
+        self.sections = tuple(section.strip("/") for section in sections)
+        self.per_page = per_page
+        self.partials_dir = partials_dir
+        self.outputs: list[str] = []
+        self._posts: list[tuple] = []
+        self._urls: set[str] = set()
+
+    def add(self, source, url: str, title: str, mtime_ns: int, metadata=None):
+        self._urls.add(url)
+        metadata = metadata or {}
+        relative = os.path.relpath(os.path.normpath(source), self.content_dir)
+        section, _, rest = relative.partition(os.sep)
+        if section not in self.sections or rest in ("", "index.md"):
+            section = None
+        tags = metadata.get("tags") or []
+        if isinstance(tags, str):
+            tags = [tags]
+        if section is None and not tags:
+            return
+        date = None
+        if "date" in metadata:
+            date = timestamp_ns(metadata["date"])
+        if date is None:
+            date = mtime_ns
+        self._posts.append((-date, url, title, section, tuple(map(str, tags))))
+
+    def close(self) -> int:
+        """Render the listing pages that changed and return how many files
+        were written or removed."""
+        self._posts.sort()
+        collections: dict[tuple[str, str], list] = {}
+        # Tags differing only in case or punctuation share a slug, and so
+        # one listing, titled after the spelling of its newest post.
+        tag_names: dict[str, str] = {}
+        for section in self.sections:
+            collections[("section", section)] = []
+        for post in self._posts:
+            if post[3] is not None:
+                collections[("section", post[3])].append(post)
+            slugs = []
+            for tag in post[4]:
+                slug = tag_slug(tag)
+                if slug and slug not in slugs:
+                    slugs.append(slug)
+                    tag_names.setdefault(slug, tag)
+            for slug in slugs:
+                collections.setdefault(("tag", slug), []).append(post)
+
+        previous = self._load_state()
+        state = {}
+        skipped = set()
+        written = 0
+        layout_digests: dict[str, str] = {}
+        for (kind, name), posts in collections.items():
+            if kind == "section":
+                base = f"/{name}/"
+                title = name.capitalize()
+                layout_source = os.path.join(self.content_dir, name, "index.md")
+            else:
+                base = f"/tags/{name}/"
+                title = f"Tag: {tag_names[name]}"
+                layout_source = os.path.join(self.content_dir, "tags", "index.md")
+            layout = find_layout(layout_source, self.content_dir, self.template_path)
+            if layout not in layout_digests:
+                layout_digests[layout] = self._layout_digest(layout)
+            pages = max(1, -(-len(posts) // self.per_page))
+            for number in range(1, pages + 1):
+                url = base if number == 1 else f"{base}page/{number}/"
+                dest = os.path.join(self.dest_dir, url.strip("/"), "index.html")
+                if self.resolver.resolve(url) in self._urls:
+                    # A content page is rendered there now, keep it.
+                    skipped.add(dest)
+                    logger.warning(
+                        "not generating listing '%s', a page already exists there.",
+                        url,
+                    )
+                    continue
+                members = posts[(number - 1) * self.per_page : number * self.per_page]
+                digest = hashlib.sha256(
+                    json.dumps(
+                        [
+                            layout_digests[layout],
+                            self.resolver.key,
+                            title,
+                            number,
+                            number < pages,
+                            [post[:3] for post in members],
+                        ]
+                    ).encode()
+                ).hexdigest()
+                state[dest] = digest
+                self.outputs.append(dest)
+                if previous.get(dest) == digest and os.path.exists(dest):
+                    continue
+                page_title = title if number == 1 else f"{title} (page {number})"
+                self._render(layout, dest, page_title, members, base, number, pages)
+                written += 1
+
+        for dest in previous:
+            if dest in state or dest in skipped:
+                continue
+            if os.path.exists(dest):
+                os.remove(dest)
+                written += 1
+        self._save_state(state)
+        logger.info(
+            "listings: %d page(s) in %d collection(s), %d file(s) updated.",
+            len(state),
+            len(collections),
+            written,
+        )
+        return written
+
+    def _render(self, layout, dest, title, members, base, number, pages):
+        items = [
+            ParentNode(
+                "li",
+                [
+                    LeafNode("a", post_title, {"href": url}),
+                    LeafNode("time", _date(-negated_date)),
+                ],
+            )
+            for negated_date, url, post_title, _, _ in members
+        ]
+        children = [LeafNode("h1", title), ParentNode("ul", items)]
+        links = []
+        if number > 1:
+            previous = base if number == 2 else f"{base}page/{number - 1}/"
+            links.append(LeafNode("a", "Newer", {"href": previous, "rel": "prev"}))
+        if number < pages:
+            links.append(
+                LeafNode(
+                    "a", "Older", {"href": f"{base}page/{number + 1}/", "rel": "next"}
+                )
+            )
+        if links:
+            children.append(ParentNode("nav", links))
+        # Entry URLs come resolved from the page sinks, so only the
+        # navigation goes through the resolver.
+        content = "".join(
+            node.to_html(self.resolver if node.tag == "nav" else None)
+            for node in children
+        )
+        template = load_template(layout, self.resolver, self.partials_dir)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, "w") as f:
+            template.write(f, {"Title": title, "Content": f"<div>{content}</div>"})
+
+    def _layout_digest(self, layout) -> str:
+        template = load_template(layout, self.resolver, self.partials_dir)
+        digest = hashlib.sha256()
+        for path in template.dependencies:
+            digest.update(f"{path}\0{hash_file(path)}\0".encode())
+        digest.update(json.dumps(self.resolver.references(template.urls)).encode())
+        return digest.hexdigest()
+
+    def _load_state(self) -> dict[str, str]:
+        if self.state_path is None:
+            return {}
+        data = load_json_state(self.state_path, LISTINGS_VERSION, "listing state")
+        return data["pages"] if data is not None else {}
+
+    def _save_state(self, state):
+        save_json_state(self.state_path, LISTINGS_VERSION, {"pages": state})
@@ -1,30 +1,363 @@
+import argparse
+import logging
+import logging.handlers
 import shutil
-import sys
 import os
+import sys
+from src.astcache import ASTCache
+from src.blockcache import BlockCache
+from src.compress import compress_outputs, parse_levels, remove_compressed
 from src.copystatic import copy_static_content
+from src.feeds import FeedWriter, SitemapWriter
+from src.images import ImageSizeIndex
+from src.listing import ListingWriter
+from src.manifest import BuildManifest
+from src.metadata import MetadataIndex
 from src.page import generate_pages_recursive
+from src.profiler import NULL_PROFILER, Profiler
+from src.search import SearchIndex
+from src.urls import UrlResolver
 
 path_dest = "./docs"
 path_source = "./static"
 content_source = "./content"
 content_dest = "./docs"
 template_path = "./template.html"
+partials_dir = "./partials"
+cache_dir = "./.cache"
+manifest_path = os.path.join(cache_dir, "build-manifest.json")
+ast_cache_dir = os.path.join(cache_dir, "ast")
+search_cache_path = os.path.join(cache_dir, "search.json")
+image_sizes_path = os.path.join(cache_dir, "images.json")
+metadata_path = os.path.join(cache_dir, "metadata.json")
+listings_path = os.path.join(cache_dir, "listings.json")
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(level, buffered: bool = True):
+    """Send log records to stderr as `LEVEL: message`.
+
+    When `buffered`, records are held in memory and written in batches (or
+    as soon as an error is logged) instead of one write per record.
+    """
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+    handler = stream
+    if buffered:
+        handler = logging.handlers.MemoryHandler(
+            capacity=1024, flushLevel=logging.ERROR, target=stream
+        )
+    root = logging.getLogger()
+    for old_handler in list(root.handlers):
+        root.removeHandler(old_handler)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site.")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help=f"delete '{path_dest}/' and the build manifest and rebuild everything",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes for page generation (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--async",
+        action="store_true",
+        dest="use_async",
+        help="overlap reading, parsing and writing pages in an asyncio pipeline",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=4,
+        metavar="N",
+        help="threads for file reads and writes with --async (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--stream-threshold",
+        type=float,
+        default=64,
+        metavar="MB",
+        help="stream markdown sources of at least this size instead of loading "
+        "them whole (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also publish pages whose front matter has draft: true",
+    )
+    parser.add_argument(
+        "--checksum-static",
+        action="store_true",
+        help="compare static files by content hash when size matches but mtime differs",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="hardlink static files into the output instead of copying them",
+    )
+    parser.add_argument(
+        "--fingerprint-static",
+        action="store_true",
+        help="copy static files under content-hashed names and point page and "
+        "template URLs at them",
+    )
+    parser.add_argument(
+        "--image-sizes",
+        action="store_true",
+        help=f"give <img> tags the width and height of the images in "
+        f"'{path_source}/', read from their headers",
+    )
+    parser.add_argument(
+        "--ast-cache-size",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="size cap of the parsed document cache, 0 disables it",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=0,
+        metavar="MB",
+        help="share rendered blocks that repeat across pages, up to this much "
+        "HTML per process (default: off)",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help=f"build a sharded search index into '{path_dest}/search/'",
+    )
+    parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="scheme and host the site is served from, e.g. https://example.com; "
+        "writes sitemap.xml and the section feeds",
+    )
+    parser.add_argument(
+        "--feed-section",
+        action="append",
+        metavar="DIR",
+        help="content directory to write Atom and RSS feeds (with --site-url) "
+        "and listings (with --listings) for (default: blog, may be repeated)",
+    )
+    parser.add_argument(
+        "--listings",
+        action="store_true",
+        help="generate paginated listing pages for the feed sections and for "
+        "every front matter tag",
+    )
+    parser.add_argument(
+        "--per-page",
+        type=int,
+        default=10,
+        metavar="N",
+        help="entries per listing page (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="write a precompressed .gz next to every page and static text asset",
+    )
+    parser.add_argument(
+        "--gzip-level",
+        action="append",
+        default=[],
+        metavar="EXT=LEVEL",
+        help="gzip level for one file type, e.g. .html=9 (0 skips the type, "
+        "may be repeated)",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_const",
+        const=logging.DEBUG,
+        default=logging.INFO,
+        dest="log_level",
+        help="also log every generated page and copied file",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_const",
+        const=logging.WARNING,
+        dest="log_level",
+        help="only log warnings and errors",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every pipeline stage and write a JSON report",
+    )
+    parser.add_argument(
+        "--profile-output",
+        default=os.path.join(cache_dir, "profile.json"),
+        metavar="REPORT",
+        help="where --profile writes its report (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of slowest pages to list in the profile report",
+    )
+    parser.add_argument(
+        "--profile-page",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="write a cProfile dump for sources matching this glob "
+        "(implies --profile, may be repeated)",
+    )
+    args = parser.parse_args(argv)
+    try:
+        args.gzip_levels = parse_levels(args.gzip_level)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.per_page <= 0:
+        parser.error("--per-page must be at least 1")
+    if args.feed_section is None:
+        args.feed_section = ["blog"]
+    if args.profile_page:
+        args.profile = True
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level)
+
+    profiler = NULL_PROFILER
+    if args.profile:
+        profiler = Profiler(
+            top=args.profile_top,
+            cprofile_patterns=args.profile_page,
+            cprofile_dir=os.path.join(os.path.dirname(args.profile_output), "cprofile"),
+        )
+
+    if args.clean:
+        if os.path.exists(path_dest):
+            logger.info("delete '%s/' directory and its contents.", path_dest)
+            shutil.rmtree(path_dest)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
 
-if not sys.argv:
-    basepath = "/"
-else:
-    basepath = sys.argv[1]
+    manifest = BuildManifest.load(manifest_path)
+    ast_cache = None
+    if args.ast_cache_size > 0:
+        ast_cache = ASTCache(ast_cache_dir, args.ast_cache_size * 1024 * 1024)
+    search_index = None
+    if args.search:
+        search_index = SearchIndex.load(search_cache_path)
+    metadata_index = MetadataIndex.load(metadata_path)
+    fingerprints = {} if args.fingerprint_static else None
+    logger.info("sync files from '%s/' to '%s/'.", path_source, path_dest)
+    with profiler.stage("static"):
+        copy_static_content(
+            path_source,
+            path_dest,
+            manifest,
+            checksum=args.checksum_static,
+            link=args.link_static,
+            fingerprints=fingerprints,
+        )
 
+    image_sizes = None
+    if args.image_sizes:
+        image_index = ImageSizeIndex.load(image_sizes_path)
+        with profiler.stage("images"):
+            image_sizes = image_index.scan(path_source)
+        image_index.save()
+    resolver = UrlResolver(args.basepath, fingerprints, image_sizes)
+    block_cache = None
+    if args.block_cache_size > 0:
+        block_cache = BlockCache(args.block_cache_size * 1024 * 1024, resolver)
+    page_sinks = []
+    if args.site_url:
+        page_sinks.append(
+            SitemapWriter(content_dest, resolver.resolve("/"), args.site_url)
+        )
+        for section in args.feed_section:
+            section = section.strip("/")
+            page_sinks.append(
+                FeedWriter(
+                    os.path.join(content_source, section),
+                    os.path.join(content_dest, section),
+                    resolver.resolve(f"/{section}/"),
+                    args.site_url,
+                )
+            )
+    if args.listings:
+        page_sinks.append(
+            ListingWriter(
+                content_source,
+                content_dest,
+                template_path,
+                resolver,
+                listings_path,
+                args.feed_section,
+                args.per_page,
+                partials_dir,
+            )
+        )
 
-def main():
-    if os.path.exists(path_dest):
-        print(f"INFO: delete '{path_dest}/' directory and its contents.")
-        shutil.rmtree(path_dest)
+    with profiler.stage("pages"):
+        generate_pages_recursive(
+            args.basepath,
+            content_source,
+            template_path,
+            content_dest,
+            manifest,
+            jobs=args.jobs,
+            profiler=profiler,
+            ast_cache=ast_cache,
+            block_cache=block_cache,
+            use_async=args.use_async,
+            io_threads=args.io_threads,
+            partials_dir=partials_dir,
+            resolver=resolver,
+            stream_threshold=int(args.stream_threshold * 1024 * 1024),
+            search_index=search_index,
+            page_sinks=page_sinks,
+            metadata_index=metadata_index,
+            drafts=args.drafts,
+        )
+    metadata_index.save()
+    with profiler.stage("sinks"):
+        for sink in page_sinks:
+            sink.close()
+    if search_index is not None:
+        with profiler.stage("search"):
+            search_index.write(os.path.join(path_dest, "search"))
+        search_index.save()
 
-    print(f"INFO: copy files from '{path_source}/' to '{path_dest}/'.")
-    copy_static_content(path_source, path_dest)
+    if args.gzip:
+        outputs = [entry["dest"] for entry in manifest.pages.values()]
+        outputs.extend(manifest.assets)
+        for sink in page_sinks:
+            outputs.extend(sink.outputs)
+        with profiler.stage("compress"):
+            compress_outputs(outputs, manifest, args.gzip_levels, args.jobs)
+    else:
+        remove_compressed(manifest)
+    manifest.save()
 
-    generate_pages_recursive(basepath, content_source, template_path, content_dest)
+    if profiler.enabled:
+        profiler.write_report(args.profile_output)
+        logger.info("profile report written to '%s'.", args.profile_output)
 
 
 if __name__ == "__main__":
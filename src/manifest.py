@@ -0,0 +1,223 @@
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+# Bump whenever a change alters the output rendered from the same inputs,
+# so pages generated by an older version are not kept as up to date.
+MANIFEST_VERSION = 8
+
+
+def hash_file(path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_if_changed(path, content: str) -> int:
+    """Write `content` to `path` unless it already holds exactly that, so
+    unchanged outputs keep their mtime. Returns the number of files written."""
+    try:
+        with open(path, "r") as f:
+            if f.read() == content:
+                return 0
+    except FileNotFoundError:
+        pass
+    with open(path, "w") as f:
+        f.write(content)
+    return 1
+
+
+def load_json_state(path, version: int, description: str) -> dict | None:
+    """The data `save_json_state` wrote to `path`, or None when the file is
+    missing, unreadable or was written for another `version`. `description`
+    names the file in the log."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning("ignoring unreadable %s '%s'", description, path)
+        return None
+    if not isinstance(data, dict) or data.get("version") != version:
+        logger.info("%s '%s' is outdated, starting from scratch", description, path)
+        return None
+    return data
+
+
+def save_json_state(path, version: int, data: dict):
+    """Atomically replace `path` with `data` tagged with `version`. Nothing
+    is written when `path` is None."""
+    if path is None:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": version, **data}, f)
+    os.replace(tmp_path, path)
+
+
+class BuildManifest:
+    """Persistent record of what the previous build produced.
+
+    Every generated page is stored under its source path together with the
+    hash of the source, the hashes of the template files it was rendered
+    with (its layout and the partials that includes), the basepath, how the
+    URLs referenced by the page and its templates resolve (fingerprinted
+    asset and image size) and the page title. A page is only regenerated when one of
+    those inputs changed or its output went missing, and outputs whose
+    sources disappeared are pruned.
+    Synced static assets are tracked the same way, keyed by destination,
+    and so are the outputs that were gzipped, with the hash and level their
+    `.gz` was produced from. Fingerprinted assets keep the hash their name
+    was derived from, reused while the source size and mtime match.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.pages: dict[str, dict] = {}
+        self.assets: dict[str, str] = {}
+        self.compressed: dict[str, dict] = {}
+        self.fingerprints: dict[str, dict] = {}
+        self._seen: set[str] = set()
+        self._seen_assets: set[str] = set()
+
+    @classmethod
+    def load(cls, path: str) -> "BuildManifest":
+        manifest = cls(path)
+        data = load_json_state(path, MANIFEST_VERSION, "build manifest")
+        if data is None:
+            return manifest
+        manifest.pages = data.get("pages", {})
+        manifest.assets = data.get("assets", {})
+        manifest.compressed = data.get("compressed", {})
+        manifest.fingerprints = data.get("fingerprints", {})
+        return manifest
+
+    def save(self):
+        save_json_state(
+            self.path,
+            MANIFEST_VERSION,
+            {
+                "pages": self.pages,
+                "assets": self.assets,
+                "compressed": self.compressed,
+                "fingerprints": self.fingerprints,
+            },
+        )
+
+    def source_hash(self, source) -> tuple[str, os.stat_result]:
+        """Hash `source`, reusing the recorded hash when size and mtime match."""
+        stat = os.stat(source)
+        entry = self.pages.get(str(source))
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return entry["hash"], stat
+        return hash_file(source), stat
+
+    def is_fresh(self, source, dest, digest, dependencies, resolver) -> bool:
+        self._seen.add(str(source))
+        entry = self.pages.get(str(source))
+        return (
+            entry is not None
+            and entry["dest"] == str(dest)
+            and entry["hash"] == digest
+            and entry["dependencies"] == dependencies
+            and entry["urls"] == resolver.key
+            and resolver.references(entry["references"]) == entry["references"]
+            and os.path.exists(dest)
+        )
+
+    def record(
+        self, source, dest, digest, stat, dependencies, resolver, urls=(), title=None
+    ):
+        """Record a generated page. `urls` are the URLs it links to, whose
+        `resolver.references` are checked by `is_fresh`."""
+        self._seen.add(str(source))
+        self.pages[str(source)] = {
+            "dest": str(dest),
+            "hash": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "dependencies": dependencies,
+            "urls": resolver.key,
+            "references": resolver.references(urls),
+            "title": title,
+        }
+
+    def prune(self) -> list[str]:
+        """Forget sources not seen in this build and delete their outputs."""
+        removed = []
+        for source in list(self.pages):
+            if source in self._seen:
+                continue
+            dest = self.pages.pop(source)["dest"]
+            if os.path.exists(dest):
+                os.remove(dest)
+                removed.append(dest)
+        self._seen = set()
+        return removed
+
+    def record_asset(self, source, dest):
+        self._seen_assets.add(str(dest))
+        self.assets[str(dest)] = str(source)
+
+    def prune_assets(self) -> list[str]:
+        """Forget assets not synced in this build and delete their copies."""
+        removed = []
+        for dest in list(self.assets):
+            if dest in self._seen_assets:
+                continue
+            del self.assets[dest]
+            if os.path.exists(dest):
+                os.remove(dest)
+                removed.append(dest)
+        self._seen_assets = set()
+        sources = set(self.assets.values())
+        for source in list(self.fingerprints):
+            if source not in sources:
+                del self.fingerprints[source]
+        return removed
+
+    def asset_hash(self, source) -> str:
+        """Hash a static file, reusing the recorded hash when size and mtime
+        match."""
+        stat = os.stat(source)
+        entry = self.fingerprints.get(str(source))
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return entry["hash"]
+        digest = hash_file(source)
+        self.fingerprints[str(source)] = {
+            "hash": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        return digest
+
+    def record_compressed(self, path, level: int, digest: str, stat):
+        self.compressed[str(path)] = {
+            "hash": digest,
+            "level": level,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def prune_compressed(self, seen) -> list[str]:
+        """Forget compressed outputs not in `seen` and return their paths."""
+        removed = [path for path in self.compressed if path not in seen]
+        for path in removed:
+            del self.compressed[path]
+        return removed
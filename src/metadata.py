@@ -0,0 +1,168 @@
+from datetime import datetime, timezone
+import itertools
+import os
+import re
+
+from src.manifest import load_json_state, save_json_state
+
+METADATA_VERSION = 1
+
+RE_TITLE = re.compile(r"^#{1}\s(.*)$", flags=re.MULTILINE)
+RE_FIELD = re.compile(r"^([\w-]+):\s*(.*)$")
+RE_FENCE_LINE = re.compile(r"^---\r?(?:\n|\Z)", flags=re.MULTILINE)
+
+FRONT_MATTER_FENCE = "---"
+
+
+def scan_title(lines) -> str:
+    """The first H1 in an iterable of lines, stopping as soon as it is found."""
+    for line in lines:
+        match = RE_TITLE.match(line.rstrip("\r\n"))
+        if match:
+            return match.group(1)
+    raise ValueError("there is not H1 header in the markdown")
+
+
+def split_front_matter(lines) -> tuple[dict, object]:
+    """Consume the front matter at the top of `lines`.
+
+    Front matter is a block of `key: value` lines between two `---` lines.
+    Values may be `true`/`false`, quoted strings or `[a, b]` lists, and a key
+    with an empty value collects the `- item` lines below it. Returns the
+    fields and an iterator over the remaining lines of the document. A
+    leading `---` block that is never closed or holds anything else is not
+    front matter, and the document is returned whole.
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, lines
+    if first.rstrip("\r\n") != FRONT_MATTER_FENCE:
+        return {}, itertools.chain((first,), lines)
+    fields = {}
+    key = None
+    consumed = [first]
+    for line in lines:
+        consumed.append(line)
+        line = line.rstrip("\r\n")
+        if line == FRONT_MATTER_FENCE:
+            return fields, lines
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key is not None:
+            if not isinstance(fields[key], list):
+                fields[key] = []
+            fields[key].append(_parse_value(stripped[2:]))
+            continue
+        match = RE_FIELD.match(line)
+        if match is None:
+            return {}, itertools.chain(consumed, lines)
+        key, value = match.groups()
+        fields[key] = _parse_value(value) if value else ""
+    return {}, iter(consumed)
+
+
+def split_markdown(markdown: str) -> tuple[dict, str]:
+    """`split_front_matter` for a whole document held in a string. Only the
+    front matter is split into lines, the body is sliced off as it is."""
+    end = markdown.find("\n")
+    if end < 0 or markdown[:end].rstrip("\r") != FRONT_MATTER_FENCE:
+        return {}, markdown
+    match = RE_FENCE_LINE.search(markdown, end + 1)
+    if match is None:
+        return {}, markdown
+    fields, rest = split_front_matter(markdown[: match.end()].splitlines())
+    if next(rest, None) is not None:
+        return {}, markdown
+    return fields, markdown[match.end() :]
+
+
+def read_metadata(lines) -> dict:
+    """The front matter of a document plus its `title`, reading no further
+    than the first H1 (or only the front matter, when it sets the title)."""
+    fields, rest = split_front_matter(lines)
+    metadata = dict(fields)
+    if not metadata.get("title"):
+        metadata["title"] = scan_title(rest)
+    metadata["draft"] = metadata.get("draft") is True
+    return metadata
+
+
+def timestamp_ns(value) -> int | None:
+    """A front matter date (`2024-05-01`, `2024-05-01T12:00:00+02:00`) in
+    nanoseconds since the epoch, naive dates being UTC."""
+    try:
+        moment = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp()) * 1_000_000_000
+
+
+def _parse_value(value: str):
+    value = value.strip()
+    if value in ("true", "false"):
+        return value == "true"
+    if value.startswith("[") and value.endswith("]"):
+        return [_parse_value(item) for item in value[1:-1].split(",") if item.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+class MetadataIndex:
+    """Front matter and title of every page, kept between builds.
+
+    An entry is reused while the size and mtime of its source are unchanged,
+    otherwise only the header of the source is read again. Listings, feeds
+    and draft filtering work from this index without opening the documents.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.pages: dict[str, dict] = {}
+        self._seen: set[str] = set()
+        self.read = 0
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataIndex":
+        index = cls(path)
+        data = load_json_state(path, METADATA_VERSION, "metadata index")
+        if data is not None:
+            index.pages = data["pages"]
+        return index
+
+    def save(self):
+        save_json_state(self.path, METADATA_VERSION, {"pages": self.pages})
+
+    def get(self, source, stat=None) -> dict:
+        source = str(source)
+        self._seen.add(source)
+        if stat is None:
+            stat = os.stat(source)
+        entry = self.pages.get(source)
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return entry["metadata"]
+        with open(source, "r") as f:
+            metadata = read_metadata(f)
+        self.read += 1
+        self.pages[source] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "metadata": metadata,
+        }
+        return metadata
+
+    def prune(self) -> list[str]:
+        """Forget pages not looked up in this build."""
+        removed = [source for source in self.pages if source not in self._seen]
+        for source in removed:
+            del self.pages[source]
+        self._seen = set()
+        return removed
@@ -1,57 +1,590 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import io
+import logging
 import os
 from pathlib import Path
-import re
 
-from src.block_md import md_to_html_node
+from src.astcache import ASTCache
+from src.block_md import (
+    iter_blocks,
+    md_to_blocks,
+    parse_block,
+    parsed_block_to_html_node,
+)
+from src.blockcache import BlockCache
+from src.htmlnode import ParentNode, node_urls
+from src.manifest import BuildManifest, hash_file
+from src.metadata import (
+    RE_TITLE,
+    MetadataIndex,
+    read_metadata,
+    scan_title,
+    split_front_matter,
+    split_markdown,
+)
+from src.profiler import NULL_PAGE, NULL_PROFILER
+from src.search import SearchIndex, page_terms
+from src.template import find_layout, load_template
+from src.urls import UrlResolver
+
+logger = logging.getLogger(__name__)
+
+
+# Output buffer used when streaming a large page to disk.
+STREAM_BUFFER_SIZE = 256 * 1024
 
 
 def extract_title(markdown):
-    title = re.findall(r"^#{1}\s(.*)$", markdown, flags=re.MULTILINE)
+    title = RE_TITLE.findall(markdown)
     if not title:
         raise ValueError("there is not H1 header in the markdown")
     return title[0]
 
 
-def generate_page(basepath, from_path, template_path, dest_path):
-    print(
-        f"INFO: Generating page from '{from_path}' to '{dest_path}' using {template_path}."
+def generate_page(
+    resolver: UrlResolver,
+    from_path,
+    template_path,
+    dest_path,
+    profiler=NULL_PROFILER,
+    ast_cache: ASTCache | None = None,
+    block_cache: BlockCache | None = None,
+    partials_dir=None,
+    stream_threshold: int | None = None,
+    index_search: bool = False,
+) -> dict:
+    """Render `from_path` into `dest_path` and return the page's entry,
+    `{"title", "urls"}`, plus the `"terms"` it contains with `index_search`.
+
+    Sources of `stream_threshold` bytes or more go through `stream_page`
+    instead, so they are never held in memory as a whole.
+    """
+    page_entry = {"terms": Counter()} if index_search else {}
+    logger.debug(
+        "Generating page from '%s' to '%s' using %s.",
+        from_path,
+        dest_path,
+        template_path,
     )
 
-    markdown_content = ""
-    template_content = ""
-    with open(from_path, "r") as f:
-        markdown_content = f.read()
-        f.close()
+    with profiler.page(from_path) as page:
+        size = os.path.getsize(from_path) if stream_threshold is not None else 0
+        if stream_threshold is not None and size >= stream_threshold:
+            logger.debug("streaming '%s' (%d bytes).", from_path, size)
+            with page.stage("stream"):
+                stream_page(
+                    resolver,
+                    from_path,
+                    template_path,
+                    dest_path,
+                    block_cache,
+                    partials_dir,
+                    page_entry,
+                )
+            if page.enabled:
+                page.bytes_in = size
+                page.bytes_out = os.path.getsize(dest_path)
+            return page_entry
+
+        with page.stage("read"):
+            with open(from_path, "r") as f:
+                markdown_content = f.read()
+                if page.enabled:
+                    page.bytes_in = os.fstat(f.fileno()).st_size
+
+        page_chunks = render_page(
+            resolver,
+            markdown_content,
+            template_path,
+            page,
+            ast_cache,
+            block_cache,
+            partials_dir,
+            page_entry,
+        )
+
+        if not os.path.exists(os.path.dirname(dest_path)):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+        with page.stage("write"):
+            with open(dest_path, "w") as f:
+                f.writelines(page_chunks)
+        if page.enabled:
+            page.bytes_out = os.path.getsize(dest_path)
+    return page_entry
+
+
+def render_page(
+    resolver: UrlResolver,
+    markdown_content,
+    template_path,
+    page=NULL_PAGE,
+    ast_cache: ASTCache | None = None,
+    block_cache: BlockCache | None = None,
+    partials_dir=None,
+    page_entry: dict | None = None,
+):
+    """Render markdown into the page template as an iterator of HTML chunks.
+
+    Serialization and templating are lazy and normally happen while the
+    chunks are written. When `page` is profiling, they are run eagerly so
+    each stage can be timed on its own. With an `ast_cache`, documents
+    parsed by an earlier build are not parsed again, and a `block_cache`
+    shares the rendering of blocks that repeat across pages. Link and image
+    URLs are mapped through `resolver` as the nodes are serialized. A
+    `page_entry` dict receives the page title and the URLs it links to, and
+    when it holds a `terms` Counter the page's search terms are counted into
+    it.
+    """
+    cached = None
+    if ast_cache is not None:
+        with page.stage("cache"):
+            cache_key = ast_cache.key(markdown_content)
+            cached = ast_cache.get(cache_key)
+    if cached is not None:
+        page_title, html_node = cached
+    else:
+        page_title, html_node = parse_page(markdown_content, page, block_cache)
+        if ast_cache is not None:
+            with page.stage("cache"):
+                ast_cache.put(cache_key, page_title, html_node)
+
+    if page_entry is not None:
+        page_entry["title"] = page_title
+        page_entry["urls"] = node_urls(html_node)
+        if "terms" in page_entry:
+            with page.stage("index"):
+                page_terms(html_node, page_entry["terms"])
 
-    with open(template_path, "r") as f:
-        template_content = f.read()
-        f.close()
+    content = html_node.iter_html(resolver)
+    if page.enabled:
+        with page.stage("render"):
+            content = "".join(content)
+    with page.stage("template"):
+        template = load_template(template_path, resolver, partials_dir)
+        context = {"Title": page_title, "Content": content}
+        if page.enabled:
+            return iter([template.render(context)])
+    return template.iter_render(context)
 
-    html_content = md_to_html_node(markdown_content).to_html()
-    page_title = extract_title(markdown_content)
 
-    page_content = template_content.replace("{{ Title }}", page_title)
-    page_content = page_content.replace("{{ Content }}", html_content)
-    page_content = page_content.replace('href="/', f'href="{basepath}')
-    page_content = page_content.replace('src="/', f'href="{basepath}')
+def stream_page(
+    resolver: UrlResolver,
+    from_path,
+    template_path,
+    dest_path,
+    block_cache: BlockCache | None = None,
+    partials_dir=None,
+    page_entry: dict | None = None,
+):
+    """Render a large markdown file block by block, straight to disk.
+
+    The source goes through a buffered line iterator twice: once to read
+    the front matter and title, which the template needs before the
+    content, then to parse
+    and serialize one block at a time. Only the current block and its
+    subtree are alive at any point, and the output is flushed in
+    `STREAM_BUFFER_SIZE` chunks. The result is identical to `render_page`,
+    and so is the `page_entry`, which is filled one block at a time.
+    """
+    terms = page_entry.get("terms") if page_entry is not None else None
+    urls = set()
+    with open(from_path, "r") as f:
+        page_title = read_metadata(f)["title"]
+    template = load_template(template_path, resolver, partials_dir)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with (
+        open(from_path, "r") as source,
+        open(dest_path, "w", buffering=STREAM_BUFFER_SIZE) as output,
+    ):
+        _, lines = split_front_matter(source)
+        content = _stream_content(
+            iter_blocks(lines), resolver, block_cache, terms, urls
+        )
+        template.write(output, {"Title": page_title, "Content": content})
+    if page_entry is not None:
+        page_entry["title"] = page_title
+        page_entry["urls"] = urls
+
+
+def _stream_content(blocks, resolver, block_cache, terms, urls):
+    # Same markup as the <div> ParentNode built by parse_page.
+    yield "<div>"
+    for block in blocks:
+        parsed = parse_block(block.text)
+        if block_cache is None:
+            node = parsed_block_to_html_node(parsed)
+        else:
+            node = block_cache.render(block.text, parsed)
+        if terms is not None:
+            page_terms(node, terms)
+        node_urls(node, urls)
+        yield from node.iter_html(resolver)
+    yield "</div>"
 
-    if not os.path.exists(os.path.dirname(dest_path)):
-        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
-    with open(dest_path, "w") as f:
-        f.write(page_content)
-        f.close()
+def parse_page(
+    markdown_content, page=NULL_PAGE, block_cache: BlockCache | None = None
+) -> tuple[str, ParentNode]:
+    with page.stage("blocks"):
+        fields, body = split_markdown(markdown_content)
+        blocks = md_to_blocks(body)
+    with page.stage("parse"):
+        parsed_blocks = [parse_block(block) for block in blocks]
+    with page.stage("inline"):
+        if block_cache is None:
+            children = [parsed_block_to_html_node(parsed) for parsed in parsed_blocks]
+        else:
+            children = [
+                block_cache.render(block, parsed)
+                for block, parsed in zip(blocks, parsed_blocks)
+            ]
+        html_node = ParentNode(tag="div", children=children, props=None)
+    # Like `read_metadata`, only the lines up to the first H1 are scanned.
+    title = fields.get("title") or scan_title(io.StringIO(body))
+    return title, html_node
 
 
-def generate_pages_recursive(basepath, dir_path_content, template_path, dest_dir_path):
-    contents = os.listdir(dir_path_content)
-    for file in contents:
+def discover_pages(dir_path_content, dest_dir_path) -> list[tuple[str, Path]]:
+    """List every markdown source under `dir_path_content` in a stable order,
+    paired with the html file it renders to."""
+    pages = []
+    for file in sorted(os.listdir(dir_path_content)):
         current_source = os.path.join(dir_path_content, file)
         current_dest = os.path.join(dest_dir_path, file)
         if os.path.isfile(current_source) and file.endswith(".md"):
-            html_dest_file = Path(current_dest).with_suffix(".html")
-            generate_page(basepath, current_source, template_path, html_dest_file)
+            pages.append((current_source, Path(current_dest).with_suffix(".html")))
         if os.path.isdir(current_source):
-            generate_pages_recursive(
-                basepath, current_source, template_path, current_dest
+            pages.extend(discover_pages(current_source, current_dest))
+    return pages
+
+
+def generate_pages_recursive(
+    basepath,
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    manifest: BuildManifest | None = None,
+    jobs: int = 1,
+    profiler=NULL_PROFILER,
+    ast_cache: ASTCache | None = None,
+    block_cache: BlockCache | None = None,
+    use_async: bool = False,
+    io_threads: int = 4,
+    partials_dir=None,
+    resolver: UrlResolver | None = None,
+    stream_threshold: int | None = None,
+    search_index: SearchIndex | None = None,
+    page_sinks=(),
+    metadata_index: MetadataIndex | None = None,
+    drafts: bool = False,
+):
+    """Generate every page under `dir_path_content`.
+
+    Each page is rendered with the `_layout.html` nearest to it in the
+    content tree, falling back to `template_path`. Layouts and the partials
+    they include are compiled once per process: the parent compiles them
+    while planning, and with `jobs` each worker process compiles its own
+    copy for the first page it renders with them, since workers need not
+    be forked from the parent. With a `manifest` a page is only
+    regenerated when its source or one of the template files it depends on
+    changed. Sources of `stream_threshold` bytes or more are streamed. A
+    `search_index` is updated with the terms of every regenerated page, and
+    pages it does not know yet are regenerated to index them.
+
+    With a `metadata_index`, pages whose front matter says `draft: true`
+    are left out (and their old output removed) unless `drafts` is set.
+
+    Every page, regenerated or not, is passed in discovery order to the
+    `add(source, url, title, mtime_ns, metadata)` of each of `page_sinks`.
+    Titles of up to date pages come from the manifest and their metadata
+    from the index, so they are not read again.
+    """
+    if partials_dir is None:
+        partials_dir = os.path.join(os.path.dirname(template_path), "partials")
+    if resolver is None:
+        resolver = UrlResolver(basepath)
+    layouts: dict[str, str] = {}
+    file_hashes: dict[str, str] = {}
+    dependencies: dict[str, dict[str, str]] = {}
+    template_urls: dict[str, tuple[str, ...]] = {}
+
+    pages = []
+    pending = []
+    skipped = 0
+    for source, dest in discover_pages(dir_path_content, dest_dir_path):
+        if manifest is None:
+            digest, stat = None, os.stat(source)
+        else:
+            digest, stat = manifest.source_hash(source)
+        metadata = {}
+        if metadata_index is not None:
+            metadata = metadata_index.get(source, stat)
+            if metadata["draft"] and not drafts:
+                logger.debug("'%s' is a draft, skipping.", source)
+                continue
+        pages.append((source, dest, stat, metadata))
+        indexed = search_index is None or search_index.is_indexed(source)
+        directory = os.path.dirname(source)
+        if directory not in layouts:
+            layouts[directory] = find_layout(source, dir_path_content, template_path)
+        layout = layouts[directory]
+        if layout not in dependencies:
+            template = load_template(layout, resolver, partials_dir)
+            template_urls[layout] = template.urls
+            dependencies[layout] = {}
+            for path in template.dependencies if manifest is not None else ():
+                if path not in file_hashes:
+                    file_hashes[path] = hash_file(path)
+                dependencies[layout][path] = file_hashes[path]
+        if manifest is None:
+            pending.append((source, dest, layout, None, stat))
+            continue
+        fresh = manifest.is_fresh(source, dest, digest, dependencies[layout], resolver)
+        if fresh and indexed:
+            logger.debug("'%s' is up to date, skipping.", dest)
+            skipped += 1
+            continue
+        pending.append((source, dest, layout, digest, stat))
+
+    index_search = search_index is not None
+    if use_async and pending:
+        # Imported here because the pipeline reuses this module's helpers.
+        from src.pipeline import generate_pages_async
+
+        entries = generate_pages_async(
+            resolver,
+            pending,
+            jobs,
+            io_threads,
+            ast_cache=ast_cache,
+            block_cache=block_cache,
+            partials_dir=partials_dir,
+            stream_threshold=stream_threshold,
+            index_search=index_search,
+        )
+    elif jobs > 1 and len(pending) > 1:
+        entries = _generate_pages_parallel(
+            resolver,
+            pending,
+            jobs,
+            profiler,
+            ast_cache,
+            block_cache,
+            partials_dir,
+            stream_threshold,
+            index_search,
+        )
+    else:
+        entries = [
+            generate_page(
+                resolver,
+                source,
+                layout,
+                dest,
+                profiler,
+                ast_cache,
+                block_cache,
+                partials_dir,
+                stream_threshold,
+                index_search,
+            )
+            for source, dest, layout, _, _ in pending
+        ]
+    logger.info("generated %d page(s), %d up to date.", len(pending), skipped)
+    if ast_cache is not None:
+        logger.info(
+            "AST cache: %d hit(s), %d miss(es).", ast_cache.hits, ast_cache.misses
+        )
+    if block_cache is not None:
+        logger.info(
+            "block cache: %d hit(s), %d miss(es).", block_cache.hits, block_cache.misses
+        )
+
+    if manifest is not None:
+        for (source, dest, layout, digest, stat), entry in zip(pending, entries):
+            manifest.record(
+                source,
+                dest,
+                digest,
+                stat,
+                dependencies[layout],
+                resolver,
+                entry["urls"].union(template_urls[layout]),
+                entry["title"],
             )
+        for dest in manifest.prune():
+            logger.info("removed '%s', its source no longer exists.", dest)
+
+    if search_index is not None:
+        for (source, dest, _, _, _), entry in zip(pending, entries):
+            url = resolver.resolve(page_url(dest, dest_dir_path))
+            search_index.update(source, url, entry["title"], entry["terms"])
+        search_index.prune()
+    if metadata_index is not None:
+        metadata_index.prune()
+
+    if page_sinks:
+        titles = {job[0]: entry["title"] for job, entry in zip(pending, entries)}
+        for source, dest, stat, metadata in pages:
+            if source in titles:
+                title = titles[source]
+            else:
+                title = manifest.pages[str(source)]["title"]
+            url = resolver.resolve(page_url(dest, dest_dir_path))
+            for sink in page_sinks:
+                sink.add(source, url, title, stat.st_mtime_ns, metadata)
+
+
+def page_url(dest, dest_dir_path) -> str:
+    """The site-absolute URL of an output file, without a trailing
+    `index.html`."""
+    relative = Path(dest).relative_to(dest_dir_path).as_posix()
+    if relative == "index.html" or relative.endswith("/index.html"):
+        relative = relative[: -len("index.html")]
+    return "/" + relative
+
+
+def _generate_pages_parallel(
+    resolver,
+    pending,
+    jobs,
+    profiler,
+    ast_cache,
+    block_cache,
+    partials_dir,
+    stream_threshold,
+    index_search,
+):
+    # Biggest pages go first so a single huge document does not end up as the
+    # straggler. Log records are buffered per page and replayed in discovery
+    # order. Each worker keeps its own block and AST cache objects for the
+    # whole build and reports their counters back with every page.
+    by_size = sorted(range(len(pending)), key=lambda i: -pending[i][4].st_size)
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(
+            logging.getLogger().getEffectiveLevel(),
+            block_cache.max_bytes if block_cache is not None else None,
+            resolver,
+            ast_cache,
+        ),
+    ) as executor:
+        futures = {
+            i: executor.submit(
+                _generate_page_job,
+                resolver,
+                pending[i][0],
+                pending[i][2],
+                pending[i][1],
+                profiler.child(),
+                partials_dir,
+                stream_threshold,
+                index_search,
+            )
+            for i in by_size
+        }
+        results = [futures[i].result() for i in range(len(pending))]
+
+    first_error = None
+    entries = []
+    for records, pages, cache_stats, entry, error in results:
+        entries.append(entry)
+        for record in records:
+            logging.getLogger(record.name).handle(record)
+        profiler.merge(pages)
+        _merge_cache_stats(cache_stats, block_cache, ast_cache)
+        if error is not None and first_error is None:
+            first_error = error
+    if first_error is not None:
+        raise first_error
+    return entries
+
+
+class _BufferingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # Format now so the record pickles without its original arguments.
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+_worker_block_cache: BlockCache | None = None
+_worker_ast_cache: ASTCache | None = None
+
+
+def _init_worker(level, block_cache_bytes, resolver, ast_cache=None):
+    # The AST cache is handed over once per worker rather than with every
+    # page, so its disk usage is only measured once per process.
+    global _worker_block_cache, _worker_ast_cache
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+    if block_cache_bytes is not None:
+        _worker_block_cache = BlockCache(block_cache_bytes, resolver)
+    _worker_ast_cache = ast_cache
+
+
+def _worker_cache_stats() -> tuple[tuple[int, int], tuple[int, int]]:
+    return tuple(
+        cache.stats() if cache is not None else (0, 0)
+        for cache in (_worker_block_cache, _worker_ast_cache)
+    )
+
+
+def _cache_stats_since(before) -> tuple[tuple[int, int], tuple[int, int]]:
+    return tuple(
+        (hits - old_hits, misses - old_misses)
+        for (hits, misses), (old_hits, old_misses) in zip(_worker_cache_stats(), before)
+    )
+
+
+def _merge_cache_stats(cache_stats, block_cache, ast_cache):
+    for cache, stats in zip((block_cache, ast_cache), cache_stats):
+        if cache is not None:
+            cache.add_stats(*stats)
+
+
+def _generate_page_job(
+    resolver,
+    from_path,
+    template_path,
+    dest_path,
+    profiler,
+    partials_dir,
+    stream_threshold,
+    index_search,
+):
+    handler = _BufferingHandler()
+    root = logging.getLogger()
+    root.addHandler(handler)
+    before = _worker_cache_stats()
+    entry = None
+    error = None
+    try:
+        entry = generate_page(
+            resolver,
+            from_path,
+            template_path,
+            dest_path,
+            profiler,
+            _worker_ast_cache,
+            _worker_block_cache,
+            partials_dir,
+            stream_threshold,
+            index_search,
+        )
+    except Exception as e:
+        error = e
+    finally:
+        root.removeHandler(handler)
+    pages = profiler.pages if profiler.enabled else []
+    return handler.records, pages, _cache_stats_since(before), entry, error
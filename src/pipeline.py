@@ -0,0 +1,248 @@
+import asyncio
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import logging
+import os
+
+from src import page as page_module
+from src.astcache import ASTCache
+from src.blockcache import BlockCache
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def generate_pages_async(
+    resolver,
+    pending,
+    jobs: int = 1,
+    io_threads: int = 4,
+    queue_size: int = 8,
+    ast_cache: ASTCache | None = None,
+    block_cache: BlockCache | None = None,
+    partials_dir=None,
+    stream_threshold: int | None = None,
+    index_search: bool = False,
+) -> list[dict | None]:
+    """Generate `pending` pages with reads, parsing and writes overlapped.
+
+    Markdown is prefetched and output flushed on a thread pool of
+    `io_threads`, while parsing and rendering run in an executor: a
+    process pool when `jobs` > 1, otherwise a single thread. The queues
+    between the stages hold at most `queue_size` pages each, so a fast
+    reader cannot pull the whole site into memory ahead of the parser.
+    Pages are read and logged in discovery order and the first failing
+    page in that order is raised, exactly as in the other modes. Sources of
+    `stream_threshold` bytes or more skip the queues and are streamed to
+    disk by the executor. Returns each page's search entry, see
+    `generate_page`.
+    """
+    return asyncio.run(
+        _run(
+            resolver,
+            pending,
+            jobs,
+            io_threads,
+            queue_size,
+            ast_cache,
+            block_cache,
+            partials_dir,
+            stream_threshold,
+            index_search,
+        )
+    )
+
+
+async def _run(
+    resolver,
+    pending,
+    jobs,
+    io_threads,
+    queue_size,
+    ast_cache,
+    block_cache,
+    partials_dir,
+    stream_threshold,
+    index_search,
+):
+    loop = asyncio.get_running_loop()
+    read_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    write_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    errors: dict[int, Exception] = {}
+    records: dict[int, list] = {}
+    entries: list[dict | None] = [None] * len(pending)
+    use_processes = jobs > 1
+    parsers = jobs if use_processes else 1
+
+    async def reader(io_pool):
+        for index, (source, dest, template_path, _, stat) in enumerate(pending):
+            logger.debug(
+                "Generating page from '%s' to '%s' using %s.",
+                source,
+                dest,
+                template_path,
+            )
+            if stream_threshold is not None and stat.st_size >= stream_threshold:
+                logger.debug("streaming '%s' (%d bytes).", source, stat.st_size)
+                await read_queue.put((index, None))
+                continue
+            try:
+                markdown_content = await loop.run_in_executor(io_pool, _read, source)
+            except Exception as e:
+                errors[index] = e
+                continue
+            await read_queue.put((index, markdown_content))
+        for _ in range(parsers):
+            await read_queue.put(_DONE)
+
+    async def parser(cpu_pool):
+        while (item := await read_queue.get()) is not _DONE:
+            index, markdown_content = item
+            source, dest, template_path, _, _ = pending[index]
+            try:
+                result = await loop.run_in_executor(
+                    cpu_pool,
+                    _render_job,
+                    resolver,
+                    markdown_content,
+                    source,
+                    template_path,
+                    dest,
+                    None if use_processes else ast_cache,
+                    None if use_processes else block_cache,
+                    partials_dir,
+                    index_search,
+                    use_processes,
+                )
+            except Exception as e:
+                errors[index] = e
+                continue
+            html, page_records, cache_stats, entries[index], error = result
+            records[index] = page_records
+            if error is not None:
+                errors[index] = error
+            if use_processes:
+                page_module._merge_cache_stats(cache_stats, block_cache, ast_cache)
+            if html is not None:
+                await write_queue.put((index, html))
+
+    async def writer(io_pool):
+        while (item := await write_queue.get()) is not _DONE:
+            index, html = item
+            try:
+                await loop.run_in_executor(io_pool, _write, pending[index][1], html)
+            except Exception as e:
+                errors[index] = e
+
+    async def parse_all(cpu_pool):
+        await asyncio.gather(*(parser(cpu_pool) for _ in range(parsers)))
+        for _ in range(io_threads):
+            await write_queue.put(_DONE)
+
+    if use_processes:
+        cpu_pool = ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=page_module._init_worker,
+            initargs=(
+                logging.getLogger().getEffectiveLevel(),
+                block_cache.max_bytes if block_cache is not None else None,
+                resolver,
+                ast_cache,
+            ),
+        )
+        # Start the workers before any I/O thread exists, forking a
+        # multi-threaded process is unsafe.
+        cpu_pool.submit(int).result()
+    else:
+        cpu_pool = ThreadPoolExecutor(max_workers=1)
+    with cpu_pool, ThreadPoolExecutor(max_workers=io_threads) as io_pool:
+        await asyncio.gather(
+            reader(io_pool),
+            parse_all(cpu_pool),
+            *(writer(io_pool) for _ in range(io_threads)),
+        )
+
+    for index in sorted(records):
+        for record in records[index]:
+            logging.getLogger(record.name).handle(record)
+    if errors:
+        raise errors[min(errors)]
+    return entries
+
+
+def _read(source) -> str:
+    with open(source, "r") as f:
+        return f.read()
+
+
+def _write(dest_path, html: str):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with open(dest_path, "w") as f:
+        f.write(html)
+
+
+def _render_job(
+    resolver,
+    markdown_content,
+    source,
+    template_path,
+    dest_path,
+    ast_cache,
+    block_cache,
+    partials_dir,
+    index_search,
+    capture_logs,
+):
+    # In a worker process the caches are the per-process ones, and log
+    # records are buffered so the parent can replay them in page order.
+    # Without `markdown_content` the page is streamed and None returned.
+    # Errors are returned rather than raised so the records logged before
+    # them are not lost.
+    if capture_logs:
+        block_cache = page_module._worker_block_cache
+        ast_cache = page_module._worker_ast_cache
+        handler = page_module._BufferingHandler()
+        logging.getLogger().addHandler(handler)
+        before = page_module._worker_cache_stats()
+    page_entry = {"terms": Counter()} if index_search else {}
+    html = None
+    error = None
+    try:
+        if markdown_content is None:
+            page_module.stream_page(
+                resolver,
+                source,
+                template_path,
+                dest_path,
+                block_cache,
+                partials_dir,
+                page_entry,
+            )
+            html = None
+        else:
+            html = "".join(
+                page_module.render_page(
+                    resolver,
+                    markdown_content,
+                    template_path,
+                    ast_cache=ast_cache,
+                    block_cache=block_cache,
+                    partials_dir=partials_dir,
+                    page_entry=page_entry,
+                )
+            )
+    except Exception as e:
+        error = e
+    finally:
+        if capture_logs:
+            logging.getLogger().removeHandler(handler)
+    if capture_logs:
+        return (
+            html,
+            handler.records,
+            page_module._cache_stats_since(before),
+            page_entry,
+            error,
+        )
+    return html, [], None, page_entry, error
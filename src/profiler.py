@@ -0,0 +1,169 @@
+import contextlib
+import cProfile
+import fnmatch
+import json
+import os
+import re
+import time
+
+
+STAGES = (
+    "read",
+    "cache",
+    "blocks",
+    "parse",
+    "inline",
+    "index",
+    "render",
+    "template",
+    "write",
+    "stream",
+)
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class PageProfile:
+    """Stage timings and sizes collected while one page is generated."""
+
+    enabled = True
+
+    def __init__(self, source):
+        self.source = str(source)
+        self.stages: dict[str, float] = {}
+        self.seconds = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "seconds": self.seconds,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "stages": self.stages,
+        }
+
+
+class _NullPageProfile:
+    enabled = False
+    bytes_in = 0
+    bytes_out = 0
+
+    def stage(self, name):
+        return _NULL_CONTEXT
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_PAGE = _NullPageProfile()
+_NULL_PAGE_CONTEXT = contextlib.nullcontext(NULL_PAGE)
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off; every hook is a shared no-op."""
+
+    enabled = False
+
+    def page(self, source):
+        return _NULL_PAGE_CONTEXT
+
+    def stage(self, name):
+        return _NULL_CONTEXT
+
+    def child(self):
+        return self
+
+    def merge(self, pages):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler:
+    """Collects per-stage totals and per-page records for a build.
+
+    Pages whose source matches one of `cprofile_patterns` (fnmatch style)
+    additionally get a cProfile dump written to `cprofile_dir`.
+    """
+
+    enabled = True
+
+    def __init__(self, top: int = 10, cprofile_patterns=(), cprofile_dir=None):
+        self.top = top
+        self.cprofile_patterns = tuple(cprofile_patterns)
+        self.cprofile_dir = cprofile_dir
+        self.build_stages: dict[str, float] = {}
+        self.pages: list[dict] = []
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def page(self, source):
+        page = PageProfile(source)
+        profile = None
+        if any(fnmatch.fnmatch(page.source, p) for p in self.cprofile_patterns):
+            profile = cProfile.Profile()
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            yield page
+        finally:
+            page.seconds = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                self._dump_cprofile(profile, page.source)
+            self.pages.append(page.to_dict())
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.build_stages[name] = self.build_stages.get(name, 0.0) + elapsed
+
+    def child(self) -> "Profiler":
+        """An empty profiler with the same settings, for a worker process."""
+        return Profiler(self.top, self.cprofile_patterns, self.cprofile_dir)
+
+    def merge(self, pages: list[dict]):
+        self.pages.extend(pages)
+
+    def report(self) -> dict:
+        stages = {name: 0.0 for name in STAGES}
+        for page in self.pages:
+            for name, seconds in page["stages"].items():
+                stages[name] = stages.get(name, 0.0) + seconds
+        slowest = sorted(self.pages, key=lambda page: -page["seconds"])
+        return {
+            "total_seconds": time.perf_counter() - self._start,
+            "pages": len(self.pages),
+            "bytes_in": sum(page["bytes_in"] for page in self.pages),
+            "bytes_out": sum(page["bytes_out"] for page in self.pages),
+            "build_stages": self.build_stages,
+            "page_stages": stages,
+            "slowest_pages": slowest[: self.top],
+        }
+
+    def write_report(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def _dump_cprofile(self, profile, source):
+        directory = self.cprofile_dir or "."
+        os.makedirs(directory, exist_ok=True)
+        name = re.sub(r"[^\w.-]+", "_", source).strip("._")
+        profile.dump_stats(os.path.join(directory, f"{name}.prof"))
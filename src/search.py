@@ -0,0 +1,147 @@
+from collections import Counter
+import json
+import logging
+import os
+import re
+
+from src.htmlnode import FrozenNode, HTMLNode
+from src.manifest import load_json_state, save_json_state, write_if_changed
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_VERSION = 1
+
+RE_TERM = re.compile(r"\w{2,}")
+
+
+def page_terms(node: HTMLNode, terms: Counter | None = None) -> Counter:
+    """Count the search terms in the text of a parsed page.
+
+    The leaves of the tree hold exactly the text of the `TextNode`s the
+    inline parser produced, and image alt text is included as well.
+    """
+    if terms is None:
+        terms = Counter()
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, FrozenNode):
+            node = node.node
+        if node.children is not None:
+            pending.extend(node.children)
+            continue
+        if node.value:
+            terms.update(RE_TERM.findall(node.value.lower()))
+        if node.props and "alt" in node.props:
+            terms.update(RE_TERM.findall(node.props["alt"].lower()))
+    return terms
+
+
+class SearchIndex:
+    """Per-page term counts and the sharded inverted index built from them.
+
+    The term counts of every page are kept in `path` between builds, so only
+    regenerated pages are re-indexed. `write` turns them into a small
+    `index.json` listing the pages, plus one `shards/<prefix>.json` per term
+    prefix of `prefix_length` characters mapping each term to flat
+    `[id, count, id, count, ...]` lists. A browser fetches `index.json` and
+    the shard for the prefix of each query term. Page ids are stable between
+    builds, so a change only rewrites the shards of the terms it touched.
+    """
+
+    def __init__(self, path: str | None = None, prefix_length: int = 2):
+        self.path = path
+        self.prefix_length = prefix_length
+        self.documents: dict[str, dict] = {}
+        self._seen: set[str] = set()
+        self._next_id: int | None = None
+
+    @classmethod
+    def load(cls, path: str, prefix_length: int = 2) -> "SearchIndex":
+        index = cls(path, prefix_length)
+        data = load_json_state(path, SEARCH_INDEX_VERSION, "search index")
+        if data is not None and data.get("prefix_length") == prefix_length:
+            index.documents = data["documents"]
+        return index
+
+    def save(self):
+        save_json_state(
+            self.path,
+            SEARCH_INDEX_VERSION,
+            {"prefix_length": self.prefix_length, "documents": self.documents},
+        )
+
+    def is_indexed(self, source) -> bool:
+        self._seen.add(str(source))
+        return str(source) in self.documents
+
+    def update(self, source, url: str, title: str, terms: dict[str, int]):
+        source = str(source)
+        self._seen.add(source)
+        previous = self.documents.get(source)
+        self.documents[source] = {
+            "id": previous["id"] if previous is not None else self._allocate_id(),
+            "url": url,
+            "title": title,
+            "terms": dict(terms),
+        }
+
+    def prune(self) -> list[str]:
+        """Forget pages not seen in this build."""
+        removed = [source for source in self.documents if source not in self._seen]
+        for source in removed:
+            del self.documents[source]
+        self._seen = set()
+        return removed
+
+    def write(self, directory) -> int:
+        """Write `index.json` and the shards into `directory`, leaving files
+        whose content did not change alone. Returns the number of files
+        written or removed."""
+        pages = [None] * (
+            max((d["id"] for d in self.documents.values()), default=-1) + 1
+        )
+        shards: dict[str, dict[str, list[int]]] = {}
+        for document in sorted(self.documents.values(), key=lambda d: d["id"]):
+            pages[document["id"]] = [document["url"], document["title"]]
+            for term, count in document["terms"].items():
+                shard = shards.setdefault(term[: self.prefix_length], {})
+                shard.setdefault(term, []).extend((document["id"], count))
+
+        shard_dir = os.path.join(directory, "shards")
+        os.makedirs(shard_dir, exist_ok=True)
+        written = 0
+        manifest = {
+            "version": SEARCH_INDEX_VERSION,
+            "prefix_length": self.prefix_length,
+            "pages": pages,
+            "shards": sorted(shards),
+        }
+        written += _write_json(os.path.join(directory, "index.json"), manifest)
+        for prefix, terms in shards.items():
+            path = os.path.join(shard_dir, f"{prefix}.json")
+            written += _write_json(path, dict(sorted(terms.items())))
+        keep = {f"{prefix}.json" for prefix in shards}
+        for name in os.listdir(shard_dir):
+            if name not in keep:
+                os.remove(os.path.join(shard_dir, name))
+                written += 1
+        logger.info(
+            "search index: %d page(s), %d shard(s), %d file(s) updated.",
+            len(self.documents),
+            len(shards),
+            written,
+        )
+        return written
+
+    def _allocate_id(self) -> int:
+        if self._next_id is None:
+            ids = [document["id"] for document in self.documents.values()]
+            self._next_id = max(ids, default=-1) + 1
+        self._next_id += 1
+        return self._next_id - 1
+
+
+def _write_json(path, data) -> int:
+    content = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return write_if_changed(path, content)
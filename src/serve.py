@@ -0,0 +1,303 @@
+import argparse
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import os
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+
+from src.main import (
+    content_source,
+    partials_dir,
+    path_source,
+    setup_logging,
+    template_path,
+)
+from src.page import render_page
+from src.template import LAYOUT_NAME, find_layout, load_template
+from src.urls import UrlResolver
+
+logger = logging.getLogger(__name__)
+
+
+class TreeSnapshot:
+    """Every file under `roots` mapped to its (mtime_ns, size), refreshed in
+    place by `poll`.
+
+    Only directories whose own mtime changed (an entry was added, removed
+    or renamed) are listed again. In the others just the files already
+    known are stat'ed, so a poll costs one stat per directory and file.
+    """
+
+    def __init__(self, *roots):
+        self.roots = roots
+        self.files: dict[str, tuple[int, int]] = {}
+        self._dirs: dict[str, tuple[int, tuple[str, ...], tuple[str, ...]]] = {}
+        self.poll()
+
+    def poll(self) -> set[str]:
+        """Refresh the snapshot and return the files edited, added or
+        removed since the previous poll."""
+        changed = set()
+        for root in self.roots:
+            if root in self._dirs:
+                continue
+            if os.path.isdir(root):
+                self._scan(root, changed)
+            else:
+                self._stat(root, changed)
+        for directory in list(self._dirs):
+            entry = self._dirs.get(directory)
+            if entry is None:
+                continue
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                self._forget(directory, changed)
+                continue
+            if mtime_ns != entry[0]:
+                self._scan(directory, changed)
+                continue
+            for path in entry[1]:
+                self._stat(path, changed)
+        return changed
+
+    def _stat(self, path, changed, stat=None):
+        try:
+            if stat is None:
+                stat = os.stat(path)
+        except FileNotFoundError:
+            if self.files.pop(path, None) is not None:
+                changed.add(path)
+            return
+        state = (stat.st_mtime_ns, stat.st_size)
+        if self.files.get(path) != state:
+            self.files[path] = state
+            changed.add(path)
+
+    def _scan(self, directory, changed):
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                entries = list(entries)
+        except FileNotFoundError:
+            self._forget(directory, changed)
+            return
+        files = []
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir():
+                subdirs.append(entry.path)
+                continue
+            files.append(entry.path)
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                stat = None
+            self._stat(entry.path, changed, stat)
+        previous = self._dirs.get(directory)
+        if previous is not None:
+            for path in set(previous[1]).difference(files):
+                self._stat(path, changed)
+            for path in set(previous[2]).difference(subdirs):
+                self._forget(path, changed)
+        self._dirs[directory] = (mtime_ns, tuple(files), tuple(subdirs))
+        for path in subdirs:
+            if path not in self._dirs:
+                self._scan(path, changed)
+
+    def _forget(self, directory, changed):
+        entry = self._dirs.pop(directory, None)
+        if entry is None:
+            return
+        for path in entry[1]:
+            if self.files.pop(path, None) is not None:
+                changed.add(path)
+        for path in entry[2]:
+            self._forget(path, changed)
+
+
+class PageCache:
+    """Rendered pages kept in memory, keyed by their markdown source.
+
+    Alongside each page the cache remembers the template files it was
+    rendered with, so an edited layout or partial only drops its dependents.
+    """
+
+    def __init__(self, basepath, content_dir, template_path, partials_dir=None):
+        self.basepath = basepath
+        self.resolver = UrlResolver(basepath)
+        self.content_dir = os.path.normpath(content_dir)
+        self.template_path = os.path.normpath(template_path)
+        if partials_dir is None:
+            partials_dir = os.path.join(os.path.dirname(self.template_path), "partials")
+        self.partials_dir = os.path.normpath(partials_dir)
+        self.pages: dict[str, bytes] = {}
+        self.dependencies: dict[str, tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    def source_for(self, url_path: str) -> str | None:
+        if not url_path.startswith(self.basepath):
+            return None
+        relative = url_path[len(self.basepath) :].strip("/")
+        if relative.endswith(".html"):
+            candidates = [relative[: -len(".html")] + ".md"]
+        else:
+            candidates = [os.path.join(relative, "index.md"), relative + ".md"]
+        for candidate in candidates:
+            source = os.path.normpath(os.path.join(self.content_dir, candidate))
+            inside = source.startswith(self.content_dir + os.sep)
+            if inside and os.path.isfile(source):
+                return source
+        return None
+
+    def get(self, source) -> bytes:
+        with self._lock:
+            page = self.pages.get(source)
+        if page is None:
+            page = self.render(source)
+        return page
+
+    def render(self, source) -> bytes:
+        with open(source, "r") as f:
+            markdown_content = f.read()
+        layout = find_layout(source, self.content_dir, self.template_path)
+        page = "".join(
+            render_page(
+                self.resolver,
+                markdown_content,
+                layout,
+                partials_dir=self.partials_dir,
+            )
+        ).encode()
+        template = load_template(layout, self.resolver, self.partials_dir)
+        with self._lock:
+            self.pages[source] = page
+            self.dependencies[source] = template.dependencies
+        return page
+
+    def dependents(self, paths) -> set[str]:
+        """Cached pages rendered with one of the template files in `paths`.
+
+        A `_layout.html` that appears or disappears changes which layout the
+        pages below it resolve to, so those pages count as dependents too.
+        """
+        paths = set(paths)
+        layout_dirs = tuple(
+            os.path.dirname(path) + os.sep
+            for path in paths
+            if os.path.basename(path) == LAYOUT_NAME
+        )
+        with self._lock:
+            return {
+                source
+                for source, dependencies in self.dependencies.items()
+                if paths.intersection(dependencies) or source.startswith(layout_dirs)
+            }
+
+    def invalidate(self, sources=None):
+        with self._lock:
+            if sources is None:
+                self.pages.clear()
+                self.dependencies.clear()
+                return
+            for source in sources:
+                self.pages.pop(source, None)
+                self.dependencies.pop(source, None)
+
+
+def watch(cache: PageCache, interval: float, stop: threading.Event):
+    """Poll the page sources and templates and refresh only the pages an
+    edit affects. Static files are served straight from their directory,
+    so they are not watched."""
+    tree = TreeSnapshot(cache.content_dir, cache.template_path, cache.partials_dir)
+    while not stop.wait(interval):
+        changed = tree.poll()
+        if not changed:
+            continue
+        start = time.perf_counter()
+        pages = {path for path in changed if path.endswith(".md")}
+        pages.update(cache.dependents(changed))
+        pages = sorted(pages)
+        cache.invalidate(pages)
+        for source in pages:
+            if source not in tree.files:
+                continue
+            try:
+                cache.render(source)
+            except Exception as e:
+                logger.error("failed to render '%s': %s", source, e)
+        elapsed = (time.perf_counter() - start) * 1e3
+        logger.info(
+            "%d change(s), rebuilt %d page(s) in %.1fms.",
+            len(changed),
+            len(pages),
+            elapsed,
+        )
+
+
+def make_handler(cache: PageCache, static_dir):
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=static_dir, **kwargs)
+
+        def do_GET(self):
+            url_path = unquote(urlsplit(self.path).path)
+            source = cache.source_for(url_path)
+            if source is None:
+                if url_path.startswith(cache.basepath):
+                    self.path = "/" + url_path[len(cache.basepath) :]
+                return super().do_GET()
+            try:
+                page = cache.get(source)
+            except Exception as e:
+                self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+                return
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(page)
+
+    return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve the site from memory and rebuild pages on change."
+    )
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.05,
+        help="seconds between polls of the content and templates",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(logging.INFO, buffered=False)
+    cache = PageCache(args.basepath, content_source, template_path, partials_dir)
+    stop = threading.Event()
+    watcher = threading.Thread(
+        target=watch, args=(cache, args.interval, stop), daemon=True
+    )
+    watcher.start()
+    server = ThreadingHTTPServer(("", args.port), make_handler(cache, path_source))
+    logger.info("serving on http://localhost:%d%s", args.port, args.basepath)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import os
+import re
+
+
+RE_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+RE_PARTIAL = re.compile(r"\{\{>\s*([\w/-]+)\s*\}\}")
+
+LAYOUT_NAME = "_layout.html"
+
+# Per process: worker processes start with an empty cache unless forked.
+_template_cache: dict[tuple, tuple[dict, "Template"]] = {}
+
+
+class Template:
+    """A template compiled into alternating literal segments and slots.
+
+    `literals` always holds one more entry than `slots`, so rendering is a
+    single pass that interleaves the two without copying the page around.
+    Slot values are strings or iterables of string chunks.
+    """
+
+    def __init__(self, literals: list[str], slots: list[str]):
+        if len(literals) != len(slots) + 1:
+            raise ValueError("a template needs exactly one more literal than slots")
+        self.literals = literals
+        self.slots = slots
+        self.dependencies: tuple[str, ...] = ()
+        self.urls: tuple[str, ...] = ()
+
+    @classmethod
+    def compile(cls, text: str, resolver=None) -> "Template":
+        """Split `text` at its placeholders. With a `resolver`, the URLs in
+        the template's own `href`/`src` attributes are resolved up front,
+        and kept as written in `urls`."""
+        urls = ()
+        if resolver is not None:
+            urls = tuple(resolver.attribute_urls(text))
+            text = resolver.rewrite_attributes(text)
+        literals = []
+        slots = []
+        position = 0
+        for match in RE_PLACEHOLDER.finditer(text):
+            literals.append(text[position : match.start()])
+            slots.append(match.group(1))
+            position = match.end()
+        literals.append(text[position:])
+        template = cls(literals, slots)
+        template.urls = urls
+        return template
+
+    def iter_render(self, context: dict):
+        literals = self.literals
+        yield literals[0]
+        for i, slot in enumerate(self.slots):
+            if slot not in context:
+                raise ValueError(f"template variable '{slot}' is not defined")
+            value = context[slot]
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+            yield literals[i + 1]
+
+    def render(self, context: dict) -> str:
+        return "".join(self.iter_render(context))
+
+    def write(self, fp, context: dict):
+        fp.writelines(self.iter_render(context))
+
+    def __repr__(self):
+        return f"Template(slots={self.slots})"
+
+
+def load_template(template_path, resolver=None, partials_dir=None) -> Template:
+    """Compile `template_path` once and reuse it until it or one of the
+    partials it includes changes.
+
+    `{{> name }}` includes `name.html` from `partials_dir`, which defaults to
+    a `partials` directory next to the template. Partials may include other
+    partials. The compiled template lists every file it was built from in
+    `dependencies`, the template itself first.
+    """
+    if partials_dir is None:
+        partials_dir = os.path.join(os.path.dirname(template_path), "partials")
+    key = (str(template_path), resolver, str(partials_dir))
+    cached = _template_cache.get(key)
+    if cached is not None and all(
+        _signature(path) == signature for path, signature in cached[0].items()
+    ):
+        return cached[1]
+    dependencies = [str(template_path)]
+    text = _expand_partials(
+        _read(template_path), partials_dir, dependencies, (str(template_path),)
+    )
+    template = Template.compile(text, resolver)
+    template.dependencies = tuple(dependencies)
+    _template_cache[key] = (
+        {path: _signature(path) for path in dependencies},
+        template,
+    )
+    return template
+
+
+def find_layout(source, content_root, default) -> str:
+    """The `_layout.html` nearest to `source`, looking in its directory and
+    each parent up to `content_root`, or `default` when there is none."""
+    root = os.path.normpath(content_root)
+    directory = os.path.dirname(os.path.normpath(source))
+    while True:
+        layout = os.path.join(directory, LAYOUT_NAME)
+        if os.path.isfile(layout):
+            return layout
+        if directory == root or not directory.startswith(root):
+            return default
+        directory = os.path.dirname(directory)
+
+
+def _expand_partials(text: str, partials_dir, dependencies: list, stack: tuple):
+    def include(match):
+        path = os.path.join(partials_dir, f"{match.group(1)}.html")
+        if path in stack:
+            raise ValueError(f"partial '{match.group(1)}' includes itself")
+        if not os.path.isfile(path):
+            raise ValueError(
+                f"partial '{match.group(1)}' not found in '{partials_dir}'"
+            )
+        if path not in dependencies:
+            dependencies.append(path)
+        return _expand_partials(
+            _read(path), partials_dir, dependencies, stack + (path,)
+        )
+
+    return RE_PARTIAL.sub(include, text)
+
+
+def _read(path) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+
+def _signature(path) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,54 @@
+import pytest
+
+from src.manifest import BuildManifest
+from src.page import generate_pages_recursive
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+@pytest.fixture
+def make_site(tmp_path):
+    """Write a site into `tmp_path` and return its root.
+
+    `files` maps paths relative to the root (`content/blog/post.md`) to
+    their text, and `template.html` holds `template`. Modules wrap this in
+    their own `site` fixture with the pages they need.
+    """
+
+    def make(files=None, template=TEMPLATE):
+        for relative, text in (files or {}).items():
+            path = tmp_path / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+        (tmp_path / "template.html").write_text(template)
+        return tmp_path
+
+    return make
+
+
+@pytest.fixture
+def build_site():
+    """Run `generate_pages_recursive` over a site from `make_site`.
+
+    Pages go to `site/out`. The build manifest in `site/manifest.json` is
+    loaded and saved around the build, and returned, unless `manifest` is
+    False. Other keyword arguments are passed on.
+    """
+
+    def build(site, basepath="/", out="docs", manifest=True, **kwargs):
+        build_manifest = None
+        if manifest:
+            build_manifest = BuildManifest.load(str(site / "manifest.json"))
+        generate_pages_recursive(
+            basepath,
+            str(site / "content"),
+            str(site / "template.html"),
+            str(site / out),
+            build_manifest,
+            **kwargs,
+        )
+        if build_manifest is not None:
+            build_manifest.save()
+        return build_manifest
+
+    return build
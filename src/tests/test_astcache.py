@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from src.astcache import ASTCache, decode_node, encode_node
+from src.block_md import md_to_html_node
+from src.urls import UrlResolver
+
+MARKDOWN = """# Title
+
+Some **bold** text with a [link](/a) and ![image](/b.png).
+
+- one
+- two
+
+```
+code
+```"""
+
+
+def test_encode_decode_round_trip():
+    node = md_to_html_node(MARKDOWN)
+    assert decode_node(encode_node(node)).to_html() == node.to_html()
+
+
+def test_ast_cache_get_put(tmp_path):
+    cache = ASTCache(str(tmp_path))
+    key = cache.key(MARKDOWN)
+    assert cache.get(key) is None
+
+    node = md_to_html_node(MARKDOWN)
+    cache.put(key, "Title", node)
+    title, cached = ASTCache(str(tmp_path)).get(key)
+    assert title == "Title"
+    assert cached.to_html() == node.to_html()
+
+
+def test_ast_cache_key_depends_on_content():
+    assert ASTCache.key("# a") != ASTCache.key("# b")
+
+
+def test_ast_cache_drops_corrupt_entries(tmp_path):
+    cache = ASTCache(str(tmp_path))
+    key = cache.key(MARKDOWN)
+    cache.put(key, "Title", md_to_html_node(MARKDOWN))
+    with open(cache._path(key), "wb") as f:
+        f.write(b"not marshal data")
+    assert cache.get(key) is None
+    assert not os.path.exists(cache._path(key))
+
+
+def test_ast_cache_evicts_least_recently_used(tmp_path):
+    node = md_to_html_node(MARKDOWN)
+    cache = ASTCache(str(tmp_path), max_bytes=10**9)
+    keys = [cache.key(f"{MARKDOWN}{i}") for i in range(4)]
+    for i, key in enumerate(keys):
+        cache.put(key, "Title", node)
+        os.utime(cache._path(key), ns=(i, i))
+    cache.get(keys[0])
+    entry_size = os.path.getsize(cache._path(keys[0]))
+
+    cache.max_bytes = entry_size * 3
+    cache.evict()
+    remaining = [key for key in keys if os.path.exists(cache._path(key))]
+    assert remaining == [keys[0], keys[3]]
+
+
+@pytest.mark.parametrize("hit", [False, True])
+def test_render_page_uses_ast_cache(tmp_path, hit, monkeypatch):
+    from src import page
+
+    template = tmp_path / "template.html"
+    template.write_text("{{ Title }}|{{ Content }}")
+    cache = ASTCache(str(tmp_path / "ast"))
+    expected = "".join(page.render_page(UrlResolver(), MARKDOWN, str(template)))
+    if hit:
+        "".join(
+            page.render_page(UrlResolver(), MARKDOWN, str(template), ast_cache=cache)
+        )
+
+        def fail(*args):
+            raise AssertionError("parsed despite a cache hit")
+
+        monkeypatch.setattr(page, "parse_page", fail)
+    actual = "".join(
+        page.render_page(UrlResolver(), MARKDOWN, str(template), ast_cache=cache)
+    )
+    assert actual == expected
+
+
+class CountingASTCache(ASTCache):
+    """Appends a line to `walks` whenever the cache directory is measured.
+
+    The count lives in a file and the class travels to the workers with
+    the pickled cache, so it works with every process start method."""
+
+    def __init__(self, directory, walks):
+        super().__init__(directory)
+        self.walks = walks
+
+    def _disk_usage(self) -> int:
+        with open(self.walks, "a") as f:
+            f.write("walk\n")
+        return super()._disk_usage()
+
+
+@pytest.mark.parametrize("mode", [{"jobs": 2}, {"jobs": 2, "use_async": True}])
+def test_workers_keep_one_ast_cache(make_site, build_site, mode, caplog):
+    site = make_site({f"content/{i}.md": f"# Page {i}\n\nText {i}." for i in range(8)})
+    caplog.set_level("INFO")
+    walks = site / "walks"
+    cache = CountingASTCache(str(site / "ast"), str(walks))
+    build_site(site, manifest=False, ast_cache=cache, **mode)
+    assert len(walks.read_text().splitlines()) <= 2
+    assert cache.stats() == (0, 8)
+    assert "AST cache: 0 hit(s), 8 miss(es)." in caplog.text
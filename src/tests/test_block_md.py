@@ -1,8 +1,15 @@
+import io
+
 from src.block_md import (
+    Block,
     BlockType,
+    ParsedBlock,
     block_to_block_type,
+    block_to_html_node,
+    iter_blocks,
     md_to_blocks,
     md_to_html_node,
+    parse_block,
 )
 import pytest
 
@@ -74,6 +81,50 @@ def test_md_to_blocks(text, expected):
     assert actual == expected
 
 
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            "para one\nstill one\n\n\n# Heading\n   \nlast",
+            [
+                Block("para one\nstill one", 0, 2),
+                Block("# Heading", 4, 5),
+                Block("last", 6, 7),
+            ],
+        ),
+        (
+            "```\nfirst\n\n\n  \nafter blanks\n```\ntext",
+            [
+                Block("```\nfirst\n\n\n  \nafter blanks\n```", 0, 7),
+                Block("text", 7, 8),
+            ],
+        ),
+        (
+            "```\nsingle block fence\n```\n\n```py\n\nx = 1\n```",
+            [
+                Block("```\nsingle block fence\n```", 0, 3),
+                Block("```py\n\nx = 1\n```", 4, 8),
+            ],
+        ),
+        (
+            "intro\n```\ncode\n",
+            [Block("intro", 0, 1), Block("```\ncode\n", 1, 4)],
+        ),
+    ],
+    ids=["blank lines", "fence with blank lines", "adjacent fences", "unclosed fence"],
+)
+def test_iter_blocks(text, expected):
+    assert list(iter_blocks(text.split("\n"))) == expected
+
+
+def test_iter_blocks_from_file_object():
+    lines = io.StringIO("# Title\r\n\r\n- a\r\n- b\r\n")
+    assert list(iter_blocks(lines)) == [
+        Block("# Title", 0, 1),
+        Block("- a\n- b", 2, 4),
+    ]
+
+
 @pytest.mark.parametrize(
     "text, expected",
     [
@@ -140,6 +191,41 @@ def test_block_to_block_type(text, expected):
     assert actual == expected
 
 
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("### Title\nignored", ParsedBlock(BlockType.HEADING, ["Title"], 3)),
+        ("####### Seven", ParsedBlock(BlockType.PARAGRAPH, ["####### Seven"])),
+        (
+            "```py\nx = `y`\n\nz\n```",
+            ParsedBlock(BlockType.CODE, ["x = `y`", "", "z"]),
+        ),
+        ("> one\n>two \n>", ParsedBlock(BlockType.QUOTE, ["one", "two", ""])),
+        ("- a\n-  b", ParsedBlock(BlockType.UNORDERED_LIST, ["a", " b"])),
+        ("- a\nb", ParsedBlock(BlockType.PARAGRAPH, ["- a\nb"])),
+        ("1. a\n9. b", ParsedBlock(BlockType.ORDERED_LIST, ["a", "b"])),
+        ("1. a\n0. b", ParsedBlock(BlockType.PARAGRAPH, ["1. a\n0. b"])),
+    ],
+    ids=[
+        "heading",
+        "too deep heading",
+        "code with backticks",
+        "quote",
+        "unordered list",
+        "broken list",
+        "ordered list",
+        "zero prefix",
+    ],
+)
+def test_parse_block(text, expected):
+    assert parse_block(text) == expected
+
+
+def test_block_to_html_node_forced_type():
+    node = block_to_html_node(BlockType.PARAGRAPH, "# not a heading")
+    assert node.to_html() == "<p># not a heading</p>"
+
+
 @pytest.mark.parametrize(
     "markdown, expected",
     [
@@ -297,7 +383,7 @@ func main(){
 Want to get in touch? [Contact me here](/contact).
 
 This site was generated with a custom-built [static site generator](https://www.boot.dev/courses/build-static-site-generator-python) from the course on [Boot.dev](https://www.boot.dev).""",
-            """<div><h1>Tolkien Fan Club</h1><p><img src="/images/tolkien.png" alt="JRR Tolkien sitting"></img></p><p>Here's the deal, <b>I like Tolkien</b>.</p><blockquote>"I am in fact a Hobbit in all but size."\n\n-- J.R.R. Tolkien</blockquote><h2>Blog posts</h2><ul><li><a href="/blog/glorfindel">Why Glorfindel is More Impressive than Legolas</a></li><li><a href="/blog/tom">Why Tom Bombadil Was a Mistake</a></li><li><a href="/blog/majesty">The Unparalleled Majesty of "The Lord of the Rings"</a></li></ul><h2>Reasons I like Tolkien</h2><ul><li>You can spend years studying the legendarium and still not understand its depths</li><li>It can be enjoyed by children and adults alike</li><li>Disney <i>didn't ruin it</i> (okay, but Amazon might have)</li><li>It created an entirely new genre of fantasy</li></ul><h2>My favorite characters (in order)</h2><ol><li>Gandalf</li><li>Bilbo</li><li>Sam</li><li>Glorfindel</li><li>Galadriel</li><li>Elrond</li><li>Thorin</li><li>Sauron</li><li>Aragorn</li></ol><p>Here's what <code>elflang</code> looks like (the perfect coding language):</p></div>""",
+            """<div><h1>Tolkien Fan Club</h1><p><img src="/images/tolkien.png" alt="JRR Tolkien sitting"></img></p><p>Here's the deal, <b>I like Tolkien</b>.</p><blockquote>"I am in fact a Hobbit in all but size."\n\n-- J.R.R. Tolkien</blockquote><h2>Blog posts</h2><ul><li><a href="/blog/glorfindel">Why Glorfindel is More Impressive than Legolas</a></li><li><a href="/blog/tom">Why Tom Bombadil Was a Mistake</a></li><li><a href="/blog/majesty">The Unparalleled Majesty of "The Lord of the Rings"</a></li></ul><h2>Reasons I like Tolkien</h2><ul><li>You can spend years studying the legendarium and still not understand its depths</li><li>It can be enjoyed by children and adults alike</li><li>Disney <i>didn't ruin it</i> (okay, but Amazon might have)</li><li>It created an entirely new genre of fantasy</li></ul><h2>My favorite characters (in order)</h2><ol><li>Gandalf</li><li>Bilbo</li><li>Sam</li><li>Glorfindel</li><li>Galadriel</li><li>Elrond</li><li>Thorin</li><li>Sauron</li><li>Aragorn</li></ol><p>Here's what <code>elflang</code> looks like (the perfect coding language):</p><pre><code>func main(){\n    fmt.Println("Aiya, Ambar!")\n}</code></pre><p>Want to get in touch? <a href="/contact">Contact me here</a>.</p><p>This site was generated with a custom-built <a href="https://www.boot.dev/courses/build-static-site-generator-python">static site generator</a> from the course on <a href="https://www.boot.dev">Boot.dev</a>.</p></div>""",
         ),
     ],
     ids=[
@@ -0,0 +1,83 @@
+import pytest
+
+from src.astcache import decode_node, encode_node
+from src.block_md import md_to_blocks, md_to_html_node, parse_block
+from src.blockcache import BlockCache
+from src.htmlnode import FrozenNode, LeafNode, ParentNode
+from src.page import parse_page
+from src.urls import UrlResolver
+
+MARKDOWN = """# Title
+
+Some **bold** text with a [link](/a) and ![image](/b.png).
+
+- one
+- two
+
+> a quote
+
+```
+code
+```"""
+
+
+def render_all(cache, markdown):
+    return [cache.render(block, parse_block(block)) for block in md_to_blocks(markdown)]
+
+
+def test_block_cache_matches_uncached_rendering():
+    cache = BlockCache()
+    _, node = parse_page(MARKDOWN, block_cache=cache)
+    assert node.to_html() == md_to_html_node(MARKDOWN).to_html()
+    assert cache.stats() == (0, 5)
+
+
+def test_block_cache_shares_fragments_between_pages():
+    cache = BlockCache()
+    first = render_all(cache, MARKDOWN)
+    second = render_all(cache, MARKDOWN)
+    assert all(a is b for a, b in zip(first, second))
+    assert cache.stats() == (5, 5)
+
+
+def test_block_cache_evicts_least_recently_used():
+    cache = BlockCache(max_bytes=60)
+    blocks = ["first block", "second block", "third block"]
+    for block in blocks:
+        cache.render(block, parse_block(block))
+    assert len(cache) == 2
+    cache.render(blocks[1], parse_block(blocks[1]))
+    assert cache.hits == 1
+    cache.render(blocks[0], parse_block(blocks[0]))
+    assert cache.misses == 4
+    assert cache.size <= cache.max_bytes
+
+
+def test_frozen_node_is_immutable():
+    node = FrozenNode(
+        ParentNode("p", [LeafNode("a", "link", {"href": "/a"}), LeafNode(None, "!")])
+    )
+    assert node.to_html() == '<p><a href="/a">link</a>!</p>'
+    with pytest.raises(AttributeError):
+        node.tag = "div"
+    with pytest.raises(AttributeError):
+        node.children.append(LeafNode(None, "x"))
+    with pytest.raises(TypeError):
+        node.children[0].props["href"] = "/b"
+    # Shared descendants are frozen as well, not just the wrapper.
+    with pytest.raises(AttributeError):
+        node.node.tag = "div"
+    with pytest.raises(AttributeError):
+        node.children[0].value = "changed"
+    with pytest.raises(AttributeError):
+        node.children[1].props = {}
+    assert isinstance(node.children[0], LeafNode)
+    assert node.to_html(UrlResolver("/site/")) == '<p><a href="/site/a">link</a>!</p>'
+    assert not hasattr(node, "__dict__")
+    assert not hasattr(node.children[0], "__dict__")
+
+
+def test_frozen_node_round_trips_through_ast_cache_encoding():
+    cache = BlockCache()
+    _, node = parse_page(MARKDOWN, block_cache=cache)
+    assert decode_node(encode_node(node)).to_html() == node.to_html()
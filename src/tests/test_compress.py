@@ -0,0 +1,82 @@
+import gzip
+import os
+
+import pytest
+
+from src.compress import (
+    DEFAULT_LEVELS,
+    compress_file,
+    compress_outputs,
+    parse_levels,
+    remove_compressed,
+)
+from src.manifest import BuildManifest
+
+
+@pytest.fixture
+def outputs(tmp_path):
+    (tmp_path / "index.html").write_text("<p>hello</p>" * 100)
+    (tmp_path / "index.css").write_text("p { color: red; }" * 100)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" * 100)
+    return [str(tmp_path / name) for name in ["index.html", "index.css", "logo.png"]]
+
+
+def test_parse_levels():
+    levels = parse_levels([".html=9", "CSS=1", "js=0"])
+    assert levels[".html"] == 9
+    assert levels[".css"] == 1
+    assert ".js" not in levels
+    assert parse_levels([]) == DEFAULT_LEVELS
+    with pytest.raises(ValueError, match="invalid compression level 'html=high'"):
+        parse_levels(["html=high"])
+
+
+def test_compress_file_is_reproducible(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text("<p>same</p>" * 50)
+    compress_file(path, 9)
+    first = (tmp_path / "page.html.gz").read_bytes()
+    os.utime(path, ns=(1, 1))
+    compress_file(path, 9)
+    assert (tmp_path / "page.html.gz").read_bytes() == first
+    assert gzip.decompress(first) == path.read_bytes()
+
+
+def test_compress_outputs_skips_unchanged(outputs):
+    manifest = BuildManifest()
+    stats = compress_outputs(outputs, manifest, jobs=2)
+    assert stats == {"compressed": 2, "unchanged": 0, "removed": 0}
+    assert not os.path.exists(outputs[2] + ".gz")
+
+    # Same content with a new mtime is hashed but not recompressed.
+    os.utime(outputs[0], ns=(1, 1))
+    stats = compress_outputs(outputs, manifest)
+    assert stats == {"compressed": 0, "unchanged": 2, "removed": 0}
+
+    with open(outputs[0], "w") as f:
+        f.write("<p>changed</p>")
+    stats = compress_outputs(outputs, manifest, {**DEFAULT_LEVELS, ".css": 1})
+    assert stats == {"compressed": 2, "unchanged": 0, "removed": 0}
+    assert gzip.decompress(open(outputs[0] + ".gz", "rb").read()) == b"<p>changed</p>"
+
+
+def test_compress_outputs_removes_stale_gz(outputs):
+    manifest = BuildManifest()
+    compress_outputs(outputs, manifest)
+    os.remove(outputs[1])
+    stats = compress_outputs(outputs, manifest)
+    assert stats == {"compressed": 0, "unchanged": 1, "removed": 1}
+    assert not os.path.exists(outputs[1] + ".gz")
+    assert list(manifest.compressed) == [outputs[0]]
+
+
+def test_build_without_gzip_removes_compressed(outputs, tmp_path):
+    manifest = BuildManifest(str(tmp_path / "manifest.json"))
+    compress_outputs(outputs, manifest)
+    manifest.save()
+
+    manifest = BuildManifest.load(manifest.path)
+    assert remove_compressed(manifest) == 2
+    assert not any(os.path.exists(path + ".gz") for path in outputs)
+    assert manifest.compressed == {}
+    assert remove_compressed(manifest) == 0
@@ -0,0 +1,111 @@
+import json
+import os
+
+import pytest
+
+from src.copystatic import copy_static_content
+from src.manifest import BuildManifest
+
+
+@pytest.fixture
+def static(tmp_path):
+    source = tmp_path / "static"
+    (source / "images").mkdir(parents=True)
+    (source / "index.css").write_text("body {}")
+    (source / "images" / "a.png").write_bytes(b"\x89PNG image")
+    return tmp_path
+
+
+def sync(root, **kwargs):
+    manifest = BuildManifest(str(root / "manifest.json"))
+    if os.path.exists(manifest.path):
+        manifest = BuildManifest.load(manifest.path)
+    stats = copy_static_content(
+        str(root / "static"), str(root / "docs"), manifest, **kwargs
+    )
+    manifest.save()
+    return stats
+
+
+def test_copy_static_content_copies_tree(static):
+    stats = sync(static)
+    assert stats == {"copied": 2, "unchanged": 0, "removed": 0}
+    assert (static / "docs" / "images" / "a.png").read_bytes() == b"\x89PNG image"
+    assert (static / "docs" / "index.css").stat().st_mtime_ns == (
+        static / "static" / "index.css"
+    ).stat().st_mtime_ns
+
+
+def test_copy_static_content_skips_unchanged(static):
+    sync(static)
+    assert sync(static) == {"copied": 0, "unchanged": 2, "removed": 0}
+
+
+def test_copy_static_content_recopies_changed(static):
+    sync(static)
+    (static / "static" / "index.css").write_text("body { color: red }")
+    assert sync(static)["copied"] == 1
+    assert (static / "docs" / "index.css").read_text() == "body { color: red }"
+
+
+def test_copy_static_content_checksum_fixes_mtime(static):
+    sync(static)
+    os.utime(static / "static" / "index.css", ns=(1, 1))
+    assert sync(static, checksum=True)["copied"] == 0
+    assert (static / "docs" / "index.css").stat().st_mtime_ns == 1
+
+
+def test_copy_static_content_removes_deleted_sources(static):
+    (static / "docs").mkdir()
+    (static / "docs" / "index.html").write_text("generated page")
+    sync(static)
+    (static / "static" / "images" / "a.png").unlink()
+    assert sync(static)["removed"] == 1
+    assert not (static / "docs" / "images" / "a.png").exists()
+    assert (static / "docs" / "index.html").exists()
+
+
+def test_copy_static_content_hardlinks(static):
+    sync(static, link=True)
+    source = static / "static" / "index.css"
+    dest = static / "docs" / "index.css"
+    assert os.path.samefile(source, dest)
+
+    (static / "static" / "index.css").unlink()
+    source.write_text("new")
+    sync(static, link=True)
+    assert dest.read_text() == "new"
+
+
+def test_copy_static_content_fingerprints(static, monkeypatch):
+    fingerprints = {}
+    assert sync(static, fingerprints=fingerprints)["copied"] == 2
+    css = fingerprints["/index.css"]
+    assert css.startswith("/index.") and css.endswith(".css")
+    assert fingerprints["/images/a.png"].startswith("/images/a.")
+    assert (static / "docs" / css[1:]).read_text() == "body {}"
+    assert not (static / "docs" / "index.css").exists()
+    assert json.loads((static / "docs" / "assets.json").read_text()) == fingerprints
+
+    # Unchanged files are not hashed again, an edit gets a new name.
+    hashed = []
+    monkeypatch.setattr(
+        "src.manifest.hash_file", lambda path: hashed.append(path) or "f" * 64
+    )
+    (static / "static" / "index.css").write_text("body { color: red }")
+    assert sync(static, fingerprints=fingerprints) == {
+        "copied": 1,
+        "unchanged": 1,
+        "removed": 1,
+    }
+    assert hashed == [str(static / "static" / "index.css")]
+    assert fingerprints["/index.css"] == "/index.ffffffffff.css"
+    assert not (static / "docs" / css[1:]).exists()
+
+
+def test_asset_manifest_removed_without_fingerprints(static):
+    sync(static, fingerprints={})
+    assert (static / "docs" / "assets.json").exists()
+    assert sync(static)["removed"] == 3
+    assert not (static / "docs" / "assets.json").exists()
+    assert (static / "docs" / "index.css").exists()
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from src.feeds import FeedWriter, SitemapWriter
+
+DAY = 86_400 * 10**9
+
+
+def test_sitemap_single_file(tmp_path):
+    sitemap = SitemapWriter(tmp_path, "/site/", "https://example.com/")
+    sitemap.add("a.md", "/site/a/", "A", 0)
+    sitemap.add("b.md", "/site/b?x=1&y=2", "B", DAY)
+    assert sitemap.close() == 1
+    assert sitemap.outputs == [str(tmp_path / "sitemap.xml")]
+    assert sorted(os.listdir(tmp_path)) == ["sitemap.xml"]
+    text = (tmp_path / "sitemap.xml").read_text()
+    assert "<loc>https://example.com/site/a/</loc>" in text
+    assert "<lastmod>1970-01-02T00:00:00+00:00</lastmod>" in text
+    assert "/site/b?x=1&amp;y=2" in text
+
+
+def test_sitemap_splits_into_index(tmp_path):
+    def write(urls):
+        sitemap = SitemapWriter(tmp_path, "/", "https://example.com", max_urls=2)
+        for i in range(urls):
+            sitemap.add(f"{i}.md", f"/{i}/", str(i), 0)
+        return sitemap.close()
+
+    assert write(5) == 4
+    assert sorted(os.listdir(tmp_path)) == [
+        "sitemap-1.xml",
+        "sitemap-2.xml",
+        "sitemap-3.xml",
+        "sitemap.xml",
+    ]
+    index = (tmp_path / "sitemap.xml").read_text()
+    assert "<sitemapindex" in index
+    assert "<loc>https://example.com/sitemap-3.xml</loc>" in index
+    assert (tmp_path / "sitemap-3.xml").read_text().count("<url>") == 1
+
+    assert write(5) == 0
+    # Shrinking the site drops the parts that are no longer listed.
+    assert write(3) == 3
+    assert sorted(os.listdir(tmp_path)) == [
+        "sitemap-1.xml",
+        "sitemap-2.xml",
+        "sitemap.xml",
+    ]
+
+
+def test_feed_keeps_latest_section_pages(tmp_path):
+    feed = FeedWriter(
+        "content/blog", tmp_path, "/blog/", "https://example.com", limit=2
+    )
+    feed.add("content/blog/index.md", "/blog/", "Blog", 9 * DAY)
+    feed.add("content/about/index.md", "/about/", "About", 8 * DAY)
+    feed.add("content/blog/old/index.md", "/blog/old/", "Old", DAY)
+    feed.add("content/blog/new/index.md", "/blog/new/", "New & shiny", 3 * DAY)
+    feed.add("content/blog/mid/index.md", "/blog/mid/", "Mid", 2 * DAY)
+    assert feed.close() == 2
+
+    atom = (tmp_path / "atom.xml").read_text()
+    assert "<title>Blog</title>" in atom
+    assert "<updated>1970-01-04T00:00:00+00:00</updated>" in atom
+    assert atom.index("New &amp; shiny") < atom.index("Mid")
+    assert "Old" not in atom and "About" not in atom
+    rss = (tmp_path / "rss.xml").read_text()
+    assert "<link>https://example.com/blog/new/</link>" in rss
+    assert "<pubDate>Sat, 03 Jan 1970 00:00:00 +0000</pubDate>" in rss
+    assert feed.close() == 0
+
+
+class Collect:
+    def __init__(self):
+        self.pages = []
+
+    def add(self, source, url, title, mtime_ns, metadata):
+        self.pages.append((os.path.basename(os.path.dirname(source)), url, title))
+
+
+@pytest.mark.parametrize("mode", [{}, {"jobs": 2}, {"use_async": True}])
+def test_generate_pages_feeds_sinks(make_site, build_site, mode):
+    site = make_site(
+        {f"content/{name}/index.md": f"# Page {name}" for name in ["a", "b"]},
+        "{{ Title }}{{ Content }}",
+    )
+
+    def build():
+        sink = Collect()
+        build_site(site, "/site/", page_sinks=[sink], **mode)
+        return sink.pages
+
+    expected = [("a", "/site/a/", "Page a"), ("b", "/site/b/", "Page b")]
+    assert build() == expected
+    # Up to date pages are listed with the title recorded in the manifest.
+    (site / "content" / "b" / "index.md").write_text("# Changed")
+    assert build() == [expected[0], ("b", "/site/b/", "Changed")]
+
+
+def test_feed_prefers_front_matter_date(tmp_path):
+    feed = FeedWriter("content/blog", tmp_path, "/blog/", "https://example.com")
+    feed.add("content/blog/a/index.md", "/blog/a/", "A", 5 * DAY, {})
+    feed.add("content/blog/b/index.md", "/blog/b/", "B", DAY, {"date": "1970-01-09"})
+    feed.close()
+    atom = (tmp_path / "atom.xml").read_text()
+    assert atom.index("<title>B</title>") < atom.index("<title>A</title>")
+    assert "<updated>1970-01-09T00:00:00+00:00</updated>" in atom
@@ -1,3 +1,5 @@
+import io
+
 import pytest
 from src.htmlnode import HTMLNode, LeafNode, ParentNode
 
@@ -111,3 +113,36 @@ def test_parent_node_many_children(parent_tag, expected_html):
     ]
     node = ParentNode(parent_tag, children)
     assert node.to_html() == expected_html
+
+
+def test_parent_node_iter_html_streams_chunks():
+    node = ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")])
+    assert list(node.iter_html()) == ["<p>", "<b>", "bold", "</b>", " text", "</p>"]
+
+
+def test_parent_node_write_html():
+    node = ParentNode(
+        "div", [ParentNode("p", [LeafNode("a", "x", {"href": "/y"})])], {"id": "z"}
+    )
+    buffer = io.StringIO()
+    node.write_html(buffer)
+    assert buffer.getvalue() == node.to_html()
+    assert buffer.getvalue() == '<div id="z"><p><a href="/y">x</a></p></div>'
+
+
+def test_html_node_to_html_not_implemented():
+    with pytest.raises(NotImplementedError):
+        HTMLNode(tag="p", value="text").to_html()
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        HTMLNode(tag="p", value="text"),
+        LeafNode("b", "text"),
+        ParentNode("p", [LeafNode("b", "text")]),
+    ],
+    ids=["html_node", "leaf_node", "parent_node"],
+)
+def test_nodes_have_no_instance_dict(node):
+    assert not hasattr(node, "__dict__")
@@ -0,0 +1,87 @@
+import struct
+
+import pytest
+
+from src.htmlnode import LeafNode
+from src.images import ImageSizeIndex, image_size
+from src.urls import UrlResolver
+
+
+def png(width, height):
+    return (
+        b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+        + struct.pack(">II", width, height)
+        + b"\x08\x06\x00\x00\x00"
+    )
+
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00" * 8
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc0" + struct.pack(">HBHH", 17, 8, height, width) + b"\x00" * 10
+    return b"\xff\xd8" + app0 + b"\xff" + sof + b"\xff\xd9"
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (png(640, 480), (640, 480)),
+        (gif(32, 16), (32, 16)),
+        (jpeg(1024, 768), (1024, 768)),
+        (jpeg(1024, 768)[:20], None),
+        (b"not an image", None),
+    ],
+)
+def test_image_size(tmp_path, data, expected):
+    path = tmp_path / "image"
+    path.write_bytes(data)
+    assert image_size(path) == expected
+
+
+def test_image_size_index_probes_only_changed_images(tmp_path, monkeypatch):
+    static = tmp_path / "static"
+    (static / "images").mkdir(parents=True)
+    (static / "images" / "a.png").write_bytes(png(10, 20))
+    (static / "b.gif").write_bytes(gif(3, 4))
+    (static / "index.css").write_text("body {}")
+    path = str(tmp_path / "images.json")
+
+    index = ImageSizeIndex(path)
+    assert index.scan(str(static)) == {"/images/a.png": (10, 20), "/b.gif": (3, 4)}
+    index.save()
+
+    probed = []
+    monkeypatch.setattr(
+        "src.images.image_size", lambda path: probed.append(path) or (5, 5)
+    )
+    (static / "b.gif").write_bytes(gif(6, 8) + b"changed")
+    index = ImageSizeIndex.load(path)
+    assert index.scan(str(static)) == {"/images/a.png": (10, 20), "/b.gif": (5, 5)}
+    assert probed == [str(static / "b.gif")]
+
+    (static / "b.gif").unlink()
+    assert index.scan(str(static)) == {"/images/a.png": (10, 20)}
+    assert list(index.images) == [str(static / "images" / "a.png")]
+
+
+def test_img_gets_intrinsic_size():
+    resolver = UrlResolver("/site/", images={"/a.png": (10, 20)})
+    node = LeafNode("img", "", {"src": "/a.png?v=2", "alt": "a"})
+    assert node.to_html(resolver) == (
+        '<img src="/site/a.png?v=2" alt="a" width="10" height="20"></img>'
+    )
+    sized = LeafNode("img", "", {"src": "/a.png", "width": "5"})
+    assert sized.to_html(resolver) == '<img src="/site/a.png" width="5"></img>'
+    assert resolver != UrlResolver("/site/")
+
+
+def test_references_record_image_sizes():
+    resolver = UrlResolver("/site/", images={"/a.png": (10, 20)})
+    urls = ["/a.png?v=2", "/b.html#top", "https://example.com/a.png", "//cdn/a.png"]
+    assert resolver.references(urls) == {
+        "/a.png": [None, [10, 20]],
+        "/b.html": [None, None],
+    }
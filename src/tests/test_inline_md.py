@@ -312,3 +312,56 @@ def test_split_nodes_image(nodes, expected):
 def test_text_to_textnodes(text, expected):
     actual = text_to_textnodes(text)
     assert actual == expected
+
+
+def split_nodes_all(text):
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "plain text only",
+        "**bold**\n_italic_",
+        "**bold**\n[link](/a)\n`code`",
+        "[a](/a)[b](/b)![c](/c.png)",
+        "broken [link(/a) and ![image](/b.png) **after**",
+        "a ![rick []roll](/x().gif) and [to boo[t dev](/y) [ok](/z)",
+        "**\n**text",
+        "trailing _italic_\n",
+    ],
+    ids=[
+        "empty",
+        "plain",
+        "newline between delimiters",
+        "newline next to link",
+        "adjacent references",
+        "unmatched brackets",
+        "nested brackets",
+        "newline only bold",
+        "trailing newline",
+    ],
+)
+def test_text_to_textnodes_matches_split_chain(text):
+    assert text_to_textnodes(text) == split_nodes_all(text)
+
+
+def test_text_to_textnodes_link_with_underscore():
+    actual = text_to_textnodes("see [docs](https://x.dev/a_b) and _this_")
+    assert actual == [
+        TextNode("see ", TextType.TEXT),
+        TextNode("docs", TextType.LINK, "https://x.dev/a_b"),
+        TextNode(" and ", TextType.TEXT),
+        TextNode("this", TextType.ITALIC),
+    ]
+
+
+def test_text_to_textnodes_unclosed_delimiter():
+    with pytest.raises(ValueError, match="Invalid markdown syntax"):
+        text_to_textnodes("an **unclosed bold")
@@ -0,0 +1,147 @@
+import os
+
+import pytest
+
+from src.listing import ListingWriter, tag_slug
+from src.urls import UrlResolver
+
+DAY = 86_400 * 10**9
+
+
+@pytest.fixture
+def site(make_site):
+    return make_site(
+        template='<title>{{ Title }}</title><link href="/a.css">{{ Content }}'
+    )
+
+
+def write(site, posts, **kwargs):
+    writer = ListingWriter(
+        str(site / "content"),
+        str(site / "docs"),
+        str(site / "template.html"),
+        UrlResolver("/site/"),
+        str(site / "listings.json"),
+        per_page=2,
+        **kwargs,
+    )
+    for name, day, tags in posts:
+        metadata = {"tags": tags} if tags else {}
+        writer.add(
+            str(site / "content" / "blog" / name / "index.md"),
+            f"/site/blog/{name}/",
+            name.capitalize(),
+            day * DAY,
+            metadata,
+        )
+    writer.add(str(site / "content" / "index.md"), "/site/", "Home", 0, {})
+    writer.add(
+        str(site / "content" / "about.md"),
+        "/site/about.html",
+        "About",
+        0,
+        {"tags": "x"},
+    )
+    return writer.close()
+
+
+POSTS = [
+    ("a", 1, ["elves"]),
+    ("b", 2, []),
+    ("c", 3, ["elves", "Ring Bearers"]),
+    ("d", 4, []),
+    ("e", 5, []),
+]
+
+
+def test_tag_slug():
+    assert tag_slug("Ring Bearers!") == "ring-bearers"
+
+
+def test_listing_pages(site):
+    assert write(site, POSTS) == 6
+    docs = site / "docs"
+    first = (docs / "blog" / "index.html").read_text()
+    assert first.startswith('<title>Blog</title><link href="/site/a.css">')
+    assert first.index("/site/blog/e/") < first.index("/site/blog/d/")
+    assert "<time>1970-01-06</time>" in first
+    assert '<a href="/site/blog/page/2/" rel="next">Older</a>' in first
+    last = (docs / "blog" / "page" / "3" / "index.html").read_text()
+    assert "<title>Blog (page 3)</title>" in last
+    assert '<a href="/site/blog/page/2/" rel="prev">Newer</a>' in last
+    assert 'rel="next"' not in last
+    elves = (docs / "tags" / "elves" / "index.html").read_text()
+    assert elves.index("/site/blog/c/") < elves.index("/site/blog/a/")
+    assert "/site/about.html" in (docs / "tags" / "x" / "index.html").read_text()
+    assert (docs / "tags" / "ring-bearers" / "index.html").exists()
+
+
+def test_only_changed_listing_pages_are_rendered(site):
+    write(site, POSTS)
+    outputs = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(site / "docs")
+        for name in files
+    )
+    for path in outputs:
+        os.utime(path, ns=(0, 0))
+
+    # Renaming the oldest post touches the last blog page and its tag page.
+    assert write(site, POSTS) == 0
+    renamed = [("z", 1, ["elves"])] + POSTS[1:]
+    assert write(site, renamed) == 2
+    changed = [path for path in outputs if os.stat(path).st_mtime_ns != 0]
+    assert changed == [
+        str(site / "docs" / "blog" / "page" / "3" / "index.html"),
+        str(site / "docs" / "tags" / "elves" / "index.html"),
+    ]
+
+    # Dropping a post shrinks the blog to two pages, the third is removed.
+    assert write(site, renamed[1:]) == 3
+    assert not (site / "docs" / "blog" / "page" / "3" / "index.html").exists()
+
+
+def test_listing_does_not_replace_content_pages(site, caplog):
+    writer = ListingWriter(
+        str(site / "content"),
+        str(site / "docs"),
+        str(site / "template.html"),
+        UrlResolver("/"),
+    )
+    writer.add(str(site / "content" / "blog" / "index.md"), "/blog/", "Blog", 0)
+    writer.add(str(site / "content" / "blog" / "a.md"), "/blog/a.html", "A", 0)
+    assert writer.close() == 0
+    assert "a page already exists there" in caplog.text
+    assert not (site / "docs" / "blog" / "index.html").exists()
+
+
+def test_listing_keeps_content_page_that_takes_its_place(site):
+    write(site, POSTS)
+    listing = site / "docs" / "blog" / "index.html"
+    assert "<title>Blog</title>" in listing.read_text()
+
+    # The build renders a new content/blog/index.md over the old listing
+    # before the listing writer is closed.
+    listing.write_text("content page")
+    writer = ListingWriter(
+        str(site / "content"),
+        str(site / "docs"),
+        str(site / "template.html"),
+        UrlResolver("/site/"),
+        str(site / "listings.json"),
+        per_page=2,
+    )
+    writer.add(str(site / "content" / "blog" / "index.md"), "/site/blog/", "Blog", 0)
+    writer.close()
+    assert listing.read_text() == "content page"
+
+
+def test_tags_sharing_a_slug_share_one_listing(site):
+    posts = [("a", 1, ["python"]), ("b", 2, ["Python"]), ("c", 3, ["Python!"])]
+    assert write(site, posts) == 5
+    tag = site / "docs" / "tags" / "python"
+    first = (tag / "index.html").read_text()
+    assert "<title>Tag: Python!</title>" in first
+    assert "/site/blog/c/" in first and "/site/blog/b/" in first
+    assert "/site/blog/a/" in (tag / "page" / "2" / "index.html").read_text()
+    assert write(site, posts) == 0
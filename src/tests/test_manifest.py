@@ -0,0 +1,148 @@
+import os
+
+import pytest
+
+from src.manifest import load_json_state, save_json_state
+from src.urls import UrlResolver
+
+
+@pytest.fixture
+def site(make_site):
+    return make_site(
+        {
+            "content/index.md": "# Home\n\nWelcome",
+            "content/blog/index.md": "# Blog\n\nPosts",
+        },
+        '<title>{{ Title }}</title><link href="/index.css">{{ Content }}',
+    )
+
+
+@pytest.fixture
+def build(site, build_site):
+    def build(basepath="/", assets=None, images=None):
+        build_site(site, basepath, resolver=UrlResolver(basepath, assets, images))
+
+    return build
+
+
+def test_unchanged_pages_are_skipped(site, build):
+    build()
+    output = site / "docs" / "index.html"
+    os.utime(output, ns=(0, 0))
+    build()
+    assert output.stat().st_mtime_ns == 0
+
+
+@pytest.mark.parametrize(
+    "change",
+    ["source", "template", "basepath", "assets", "output"],
+)
+def test_changed_inputs_rebuild(site, change, build):
+    build()
+    output = site / "docs" / "index.html"
+    os.utime(output, ns=(0, 0))
+    basepath = "/"
+    assets = None
+    match change:
+        case "source":
+            (site / "content" / "index.md").write_text("# Home\n\nChanged")
+        case "template":
+            (site / "template.html").write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        case "basepath":
+            basepath = "/site/"
+        case "assets":
+            assets = {"/index.css": "/index.0123456789.css"}
+        case "output":
+            output.unlink()
+    build(basepath, assets)
+    assert output.exists()
+    assert output.stat().st_mtime_ns != 0
+
+
+def test_removed_sources_are_pruned(site, build):
+    build()
+    (site / "content" / "blog" / "index.md").unlink()
+    build()
+    assert not (site / "docs" / "blog" / "index.html").exists()
+    assert (site / "docs" / "index.html").exists()
+
+
+def rebuilt(site) -> set[str]:
+    """Outputs written since the last call, which resets their mtimes."""
+    outputs = {
+        "home": site / "docs" / "index.html",
+        "blog": site / "docs" / "blog" / "index.html",
+    }
+    written = {name for name, path in outputs.items() if path.stat().st_mtime_ns != 0}
+    for path in outputs.values():
+        os.utime(path, ns=(0, 0))
+    return written
+
+
+def test_template_edits_only_rebuild_dependent_pages(site, build):
+    (site / "partials").mkdir()
+    (site / "partials" / "nav.html").write_text("<nav></nav>")
+    layout = site / "content" / "blog" / "_layout.html"
+    layout.write_text("{{> nav }}<main>{{ Content }}</main>")
+    build()
+    assert rebuilt(site) == {"home", "blog"}
+    assert (site / "docs" / "blog" / "index.html").read_text() == (
+        "<nav></nav><main><div><h1>Blog</h1><p>Posts</p></div></main>"
+    )
+
+    (site / "partials" / "nav.html").write_text("<nav>new</nav>")
+    build()
+    assert rebuilt(site) == {"blog"}
+
+    (site / "template.html").write_text("<h1>{{ Title }}</h1>{{ Content }}")
+    build()
+    assert rebuilt(site) == {"home"}
+
+    layout.unlink()
+    build()
+    assert rebuilt(site) == {"blog"}
+
+
+def test_image_changes_only_rebuild_pages_using_them(site, build):
+    (site / "content" / "index.md").write_text("# Home\n\n![logo](/logo.png?v=1)")
+    build(images={"/logo.png": (10, 20), "/other.png": (1, 1)})
+    assert rebuilt(site) == {"home", "blog"}
+    assert 'width="10" height="20"' in (site / "docs" / "index.html").read_text()
+
+    build(images={"/logo.png": (10, 20), "/other.png": (2, 2)})
+    assert rebuilt(site) == set()
+    build(images={"/logo.png": (30, 40), "/other.png": (2, 2)})
+    assert rebuilt(site) == {"home"}
+    build()
+    assert rebuilt(site) == {"home"}
+
+
+def test_asset_changes_only_rebuild_pages_using_them(site, build):
+    (site / "content" / "blog" / "index.md").write_text(
+        "# Blog\n\n[feed](/blog/atom.xml)"
+    )
+    layout = site / "content" / "blog" / "_layout.html"
+    layout.write_text("{{ Content }}")
+    build()
+    assert rebuilt(site) == {"home", "blog"}
+
+    # Only the root template links the stylesheet, only the blog the feed.
+    build(assets={"/index.css": "/index.0123456789.css"})
+    assert rebuilt(site) == {"home"}
+    assert "/index.0123456789.css" in (site / "docs" / "index.html").read_text()
+    build(assets={"/index.css": "/index.0123456789.css", "/x.js": "/x.1.js"})
+    assert rebuilt(site) == set()
+    build(assets={"/blog/atom.xml": "/blog/atom.1.xml"})
+    assert rebuilt(site) == {"home", "blog"}
+
+
+def test_json_state_round_trip(tmp_path, caplog):
+    path = str(tmp_path / "cache" / "state.json")
+    assert load_json_state(path, 1, "state") is None
+    save_json_state(path, 1, {"pages": {"a": 1}})
+    assert load_json_state(path, 1, "state") == {"version": 1, "pages": {"a": 1}}
+    assert load_json_state(path, 2, "state") is None
+    (tmp_path / "cache" / "state.json").write_text("{not json")
+    assert load_json_state(path, 1, "state") is None
+    assert f"ignoring unreadable state '{path}'" in caplog.text
+    save_json_state(None, 1, {})
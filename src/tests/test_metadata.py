@@ -0,0 +1,124 @@
+import os
+
+from src.metadata import (
+    MetadataIndex,
+    read_metadata,
+    split_front_matter,
+    split_markdown,
+    timestamp_ns,
+)
+from src.page import render_page
+from src.urls import UrlResolver
+
+FRONT_MATTER = """---
+title: "Hello: world"
+date: 2024-05-01
+draft: false
+tags: [lotr, elves]
+authors:
+  - frodo
+  - sam
+---
+"""
+
+
+def test_split_front_matter():
+    fields, rest = split_front_matter(
+        (FRONT_MATTER + "# Title\nbody\n").splitlines(True)
+    )
+    assert fields == {
+        "title": "Hello: world",
+        "date": "2024-05-01",
+        "draft": False,
+        "tags": ["lotr", "elves"],
+        "authors": ["frodo", "sam"],
+    }
+    assert list(rest) == ["# Title\n", "body\n"]
+
+    fields, rest = split_front_matter(["# Title\n", "---\n"])
+    assert fields == {} and list(rest) == ["# Title\n", "---\n"]
+    fields, rest = split_front_matter(["---\n", "title: x\n"])
+    assert fields == {} and list(rest) == ["---\n", "title: x\n"]
+    lines = ["---\n", "A rule, then text\n", "---\n", "more\n"]
+    fields, rest = split_front_matter(lines)
+    assert fields == {} and list(rest) == lines
+
+
+def test_split_markdown():
+    assert split_markdown(FRONT_MATTER + "# Title\n---\nbody") == (
+        split_front_matter(FRONT_MATTER.splitlines())[0],
+        "# Title\n---\nbody",
+    )
+    assert split_markdown("---\n\n# Title") == ({}, "---\n\n# Title")
+    assert split_markdown("---\nA rule\n---\n") == ({}, "---\nA rule\n---\n")
+    assert split_markdown("--- not a fence\n# Title") == (
+        {},
+        "--- not a fence\n# Title",
+    )
+
+
+def test_read_metadata_stops_at_the_first_h1():
+    def lines():
+        yield "---\n"
+        yield "draft: true\n"
+        yield "---\n"
+        yield "intro\n"
+        yield "# The Title\n"
+        raise AssertionError("read past the title")
+
+    assert read_metadata(lines()) == {"draft": True, "title": "The Title"}
+    assert read_metadata(["---\n", "title: Set\n", "---\n"])["title"] == "Set"
+
+
+def test_timestamp_ns():
+    assert timestamp_ns("1970-01-02") == 86_400 * 10**9
+    assert timestamp_ns("1970-01-01T01:00:00+01:00") == 0
+    assert timestamp_ns("yesterday") is None
+
+
+def test_metadata_index_reads_only_changed_sources(tmp_path):
+    source = tmp_path / "a.md"
+    source.write_text(FRONT_MATTER + "# A")
+    path = str(tmp_path / "metadata.json")
+    index = MetadataIndex(path)
+    assert index.get(source)["tags"] == ["lotr", "elves"]
+    index.save()
+
+    index = MetadataIndex.load(path)
+    assert index.get(source)["title"] == "Hello: world"
+    assert index.read == 0
+    source.write_text("# Changed")
+    assert index.get(source) == {"title": "Changed", "draft": False}
+    assert index.read == 1
+    assert index.prune() == []
+    assert index.prune() == [str(source)]
+
+
+def test_render_page_strips_front_matter(tmp_path):
+    template = tmp_path / "template.html"
+    template.write_text("<title>{{ Title }}</title>{{ Content }}")
+    html = "".join(
+        render_page(UrlResolver(), FRONT_MATTER + "# Heading\n\ntext", str(template))
+    )
+    assert html == ("<title>Hello: world</title><div><h1>Heading</h1><p>text</p></div>")
+
+
+def test_drafts_are_not_published(make_site, build_site):
+    site = make_site(
+        {f"content/{name}/index.md": f"# Page {name}" for name in ["a", "b"]},
+        "{{ Content }}",
+    )
+
+    def build(**kwargs):
+        index = MetadataIndex.load(str(site / "metadata.json"))
+        build_site(site, metadata_index=index, **kwargs)
+        index.save()
+
+    build()
+    assert (site / "docs" / "b" / "index.html").exists()
+    (site / "content" / "b" / "index.md").write_text("---\ndraft: true\n---\n# Page b")
+    build()
+    assert not (site / "docs" / "b" / "index.html").exists()
+    assert (site / "docs" / "a" / "index.html").exists()
+    build(drafts=True)
+    assert os.path.exists(site / "docs" / "b" / "index.html")
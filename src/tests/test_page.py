@@ -1,6 +1,19 @@
+import json
+import logging
+import tracemalloc
+
 import pytest
 
-from src.page import extract_title
+from src.blockcache import BlockCache
+from src.page import (
+    discover_pages,
+    extract_title,
+    render_page,
+    scan_title,
+    stream_page,
+)
+from src.profiler import STAGES, Profiler
+from src.urls import UrlResolver
 
 
 @pytest.mark.parametrize(
@@ -25,3 +38,152 @@ def test_extract_title_exception(markdown_text):
     with pytest.raises(ValueError) as e:
         extract_title(markdown_text)
         assert "there is not H1 header in the markdown" == str(e.value)
+
+
+@pytest.fixture
+def content_tree(make_site):
+    return make_site(
+        {
+            f"content/{name}/index.md": f"# Page {name}\n\n" + "text " * 100
+            for name in ["a", "b", "c", "d"]
+        }
+    )
+
+
+def test_discover_pages_is_sorted(content_tree):
+    pages = discover_pages(str(content_tree / "content"), "docs")
+    assert [str(dest) for _, dest in pages] == [
+        f"docs/{name}/index.html" for name in ["a", "b", "c", "d"]
+    ]
+
+
+def test_generate_pages_parallel_matches_sequential(content_tree, build_site, caplog):
+    caplog.set_level(logging.DEBUG)
+    build_site(content_tree, out="seq", manifest=False)
+    sequential_log = [r.getMessage().replace("/seq/", "/out/") for r in caplog.records]
+    caplog.clear()
+    build_site(content_tree, out="par", manifest=False, jobs=2)
+    parallel_log = [r.getMessage().replace("/par/", "/out/") for r in caplog.records]
+
+    assert len(sequential_log) == 5
+    assert parallel_log == sequential_log
+    for name in ["a", "b", "c", "d"]:
+        page = f"{name}/index.html"
+        assert (content_tree / "par" / page).read_text() == (
+            content_tree / "seq" / page
+        ).read_text()
+
+
+def test_generate_pages_parallel_merges_block_cache_stats(
+    content_tree, build_site, caplog
+):
+    caplog.set_level(logging.INFO)
+    cache = BlockCache()
+    build_site(content_tree, manifest=False, jobs=2, block_cache=cache)
+    # Every page shares its paragraph with the others but has its own title.
+    assert cache.hits + cache.misses == 8
+    assert cache.misses >= 5
+    assert "block cache: %d hit(s), %d miss(es)." % cache.stats() in caplog.messages
+
+
+def test_generate_pages_parallel_reports_first_error(content_tree, build_site):
+    (content_tree / "content" / "b" / "index.md").write_text("no title")
+    (content_tree / "content" / "c" / "index.md").write_text("no title either")
+    with pytest.raises(ValueError, match="there is not H1 header"):
+        build_site(content_tree, manifest=False, jobs=2)
+    assert (content_tree / "docs" / "d" / "index.html").exists()
+
+
+def test_generate_pages_profiled(content_tree, build_site, tmp_path):
+    profiler = Profiler(top=2, cprofile_patterns=["*/b/*"], cprofile_dir=tmp_path)
+    build_site(content_tree, manifest=False, jobs=2, profiler=profiler)
+    profiler.write_report(str(tmp_path / "report.json"))
+    with open(tmp_path / "report.json") as f:
+        report = json.load(f)
+
+    assert report["pages"] == 4
+    assert len(report["slowest_pages"]) == 2
+    assert set(report["page_stages"]) == set(STAGES)
+    assert report["bytes_out"] == sum(
+        (content_tree / "docs" / name / "index.html").stat().st_size
+        for name in ["a", "b", "c", "d"]
+    )
+    assert list(tmp_path.glob("*.prof"))
+
+
+STREAM_MARKDOWN = """Intro before the title.
+
+# Big *reference* page
+
+Some **bold** text and a [link](/a).\r
+\r
+```
+code with a blank line
+
+inside
+```
+
+- one
+- two
+
+> quoted
+> text
+"""
+
+
+def test_scan_title_matches_extract_title():
+    assert scan_title(STREAM_MARKDOWN.splitlines(True)) == extract_title(
+        STREAM_MARKDOWN
+    )
+    with pytest.raises(ValueError, match="there is not H1 header"):
+        scan_title(["## only h2\n", "text\n"])
+
+
+@pytest.mark.parametrize(
+    "markdown",
+    [STREAM_MARKDOWN, "---\ntitle: Override\ntags: [a, b]\n---\n" + STREAM_MARKDOWN],
+)
+def test_stream_page_matches_render_page(tmp_path, markdown):
+    source = tmp_path / "page.md"
+    source.write_bytes(markdown.encode())
+    template = tmp_path / "template.html"
+    template.write_text('<title>{{ Title }}</title><a href="/">{{ Content }}</a>')
+    resolver = UrlResolver("/site/")
+
+    stream_page(resolver, str(source), str(template), str(tmp_path / "out.html"))
+    with open(source) as f:
+        expected = "".join(render_page(resolver, f.read(), str(template)))
+    assert (tmp_path / "out.html").read_text() == expected
+
+
+@pytest.mark.parametrize(
+    "mode", [{}, {"jobs": 2}, {"use_async": True}, {"use_async": True, "jobs": 2}]
+)
+def test_generate_pages_streamed_output_is_identical(content_tree, build_site, mode):
+    build_site(content_tree, out="whole", manifest=False)
+    build_site(content_tree, out="stream", manifest=False, stream_threshold=0, **mode)
+    for name in ["a", "b", "c", "d"]:
+        page = f"{name}/index.html"
+        assert (content_tree / "stream" / page).read_text() == (
+            content_tree / "whole" / page
+        ).read_text()
+
+
+def test_stream_page_memory_is_bounded(tmp_path):
+    source = tmp_path / "big.md"
+    paragraph = "Some **bold** text with a [link](/a) in a long paragraph. " * 20
+    with open(source, "w") as f:
+        f.write("# Big\n\n")
+        for _ in range(1000):
+            f.write(paragraph + "\n\n")
+    template = tmp_path / "template.html"
+    template.write_text("{{ Title }}{{ Content }}")
+
+    tracemalloc.start()
+    try:
+        stream_page(UrlResolver(), str(source), str(template), str(tmp_path / "o"))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert source.stat().st_size > 1_000_000
+    assert peak < source.stat().st_size / 2
@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from src import pipeline
+from src.astcache import ASTCache
+from src.page import discover_pages
+from src.urls import UrlResolver
+
+
+@pytest.fixture
+def content_tree(make_site):
+    return make_site(
+        {
+            f"content/p{i:02}/index.md": f"# Page {i}\n\nshared text [link](/a)\n\n"
+            + "words " * (50 * i)
+            for i in range(12)
+        }
+    )
+
+
+@pytest.fixture
+def build(content_tree, build_site, caplog):
+    """Build into `out` and return the log, with `out` replaced by `/out/`."""
+
+    def build(out, **kwargs):
+        caplog.clear()
+        build_site(content_tree, "/blog/", out, manifest=False, **kwargs)
+        return [
+            r.getMessage().replace(f"/{out}/", "/out/")
+            for r in caplog.records
+            if r.name.startswith("src.")
+        ]
+
+    return build
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_async_pipeline_matches_sequential(content_tree, build, caplog, jobs):
+    caplog.set_level(logging.DEBUG)
+    sequential_log = build("seq")
+    async_log = build("async", use_async=True, jobs=jobs, io_threads=3)
+
+    assert async_log == sequential_log
+    for source, dest in discover_pages(str(content_tree / "content"), "seq"):
+        assert (content_tree / "async" / dest.relative_to("seq")).read_text() == (
+            content_tree / dest
+        ).read_text()
+
+
+def test_async_pipeline_reports_first_error(content_tree, build_site):
+    (content_tree / "content" / "p03" / "index.md").write_text("no title")
+    (content_tree / "content" / "p07" / "index.md").write_text("none here either")
+    with pytest.raises(ValueError, match="there is not H1 header"):
+        build_site(content_tree, manifest=False, use_async=True)
+    assert (content_tree / "docs" / "p11" / "index.html").exists()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_async_pipeline_keeps_records_of_failed_pages(
+    content_tree, build, caplog, jobs
+):
+    # The unreadable AST cache entry is logged, then the page fails to parse.
+    markdown = "no title"
+    (content_tree / "content" / "p03" / "index.md").write_text(markdown)
+    cache = ASTCache(str(content_tree / "ast"))
+    entry = content_tree / "ast" / cache.key(markdown)[:2] / cache.key(markdown)
+    entry.parent.mkdir(parents=True)
+    warnings = []
+    for kwargs in [{}, {"use_async": True, "jobs": jobs}]:
+        entry.write_bytes(b"garbage")
+        caplog.clear()
+        with pytest.raises(ValueError, match="there is not H1 header"):
+            build("out", ast_cache=cache, **kwargs)
+        warnings.append(
+            [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+        )
+    assert (
+        warnings[0] == warnings[1] == [f"dropping unreadable AST cache entry '{entry}'"]
+    )
+
+
+def test_async_pipeline_bounds_pages_in_flight(content_tree, monkeypatch):
+    lock = threading.Lock()
+    counts = {"read": 0, "written": 0, "max_ahead": 0}
+    read, write = pipeline._read, pipeline._write
+
+    def counting_read(source):
+        with lock:
+            counts["read"] += 1
+            ahead = counts["read"] - counts["written"]
+            counts["max_ahead"] = max(counts["max_ahead"], ahead)
+        return read(source)
+
+    def slow_write(dest_path, html):
+        time.sleep(0.01)
+        write(dest_path, html)
+        with lock:
+            counts["written"] += 1
+
+    monkeypatch.setattr(pipeline, "_read", counting_read)
+    monkeypatch.setattr(pipeline, "_write", slow_write)
+    template = str(content_tree / "template.html")
+    pending = [
+        (source, dest, template, None, None)
+        for source, dest in discover_pages(
+            str(content_tree / "content"), str(content_tree / "docs")
+        )
+    ]
+    pipeline.generate_pages_async(UrlResolver(), pending, io_threads=1, queue_size=1)
+
+    assert counts["written"] == 12
+    # One page per queue slot plus one held by each stage.
+    assert counts["max_ahead"] <= 5
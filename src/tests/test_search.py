@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from src.block_md import md_to_html_node
+from src.page import page_url
+from src.search import SearchIndex, page_terms
+
+
+def test_page_terms():
+    node = md_to_html_node(
+        "# The Ring\n\nThe **ring** of _power_ and ![a ring image](/r.png).\n\n"
+        "```\nring = 1\n```"
+    )
+    assert page_terms(node) == {
+        "the": 2,
+        "ring": 4,
+        "of": 1,
+        "power": 1,
+        "and": 1,
+        "image": 1,
+    }
+
+
+@pytest.mark.parametrize(
+    "dest, expected",
+    [
+        ("docs/index.html", "/"),
+        ("docs/blog/post/index.html", "/blog/post/"),
+        ("docs/about.html", "/about.html"),
+    ],
+)
+def test_page_url(dest, expected):
+    assert page_url(dest, "docs") == expected
+
+
+def test_search_index_writes_only_changed_shards(tmp_path):
+    index = SearchIndex()
+    index.update("a.md", "/a/", "A", {"ring": 2, "rivendell": 1})
+    index.update("b.md", "/b/", "B", {"ring": 1, "mordor": 3})
+    out = tmp_path / "search"
+    assert index.write(out) == 3
+
+    manifest = json.loads((out / "index.json").read_text())
+    assert manifest["pages"] == [["/a/", "A"], ["/b/", "B"]]
+    assert manifest["shards"] == ["mo", "ri"]
+    assert json.loads((out / "shards" / "ri.json").read_text()) == {
+        "ring": [0, 2, 1, 1],
+        "rivendell": [0, 1],
+    }
+
+    index.update("b.md", "/b/", "B", {"ring": 1, "mount": 1})
+    assert index.write(out) == 1
+    assert index.write(out) == 0
+
+
+def test_search_index_ids_are_stable(tmp_path):
+    path = str(tmp_path / "search.json")
+    index = SearchIndex(path)
+    for name in ["a", "b", "c"]:
+        index.update(f"{name}.md", f"/{name}/", name, {name * 2: 1})
+    index.save()
+
+    index = SearchIndex.load(path)
+    assert index.is_indexed("a.md") and index.is_indexed("c.md")
+    assert not index.is_indexed("d.md")
+    index.update("d.md", "/d/", "d", {"dd": 1})
+    assert index.prune() == ["b.md"]
+    assert {doc["url"]: doc["id"] for doc in index.documents.values()} == {
+        "/a/": 0,
+        "/c/": 2,
+        "/d/": 3,
+    }
+
+
+@pytest.fixture
+def site(make_site):
+    return make_site(
+        {
+            f"content/{name}/index.md": f"# Page {name}\n\nabout {name}{name}"
+            for name in ["a", "b", "c"]
+        },
+        "{{ Title }}{{ Content }}",
+    )
+
+
+@pytest.fixture
+def build(site, build_site):
+    def build(**kwargs):
+        index = SearchIndex.load(str(site / "search.json"))
+        build_site(site, "/site/", search_index=index, **kwargs)
+        index.save()
+        return index
+
+    return build
+
+
+@pytest.mark.parametrize(
+    "mode", [{}, {"jobs": 2}, {"use_async": True}, {"stream_threshold": 0}]
+)
+def test_generate_pages_indexes_changed_pages(site, build, mode):
+    index = build(**mode)
+    assert index.documents[str(site / "content" / "b" / "index.md")] == {
+        "id": 1,
+        "url": "/site/b/",
+        "title": "Page b",
+        "terms": {"page": 1, "about": 1, "bb": 1},
+    }
+
+    (site / "content" / "b" / "index.md").write_text("# Page b\n\nchanged")
+    (site / "content" / "c" / "index.md").unlink()
+    (site / "search.json").write_text(
+        (site / "search.json").read_text().replace('"aa"', '"stale"')
+    )
+    index = build(**mode)
+    terms = {doc["url"]: doc["terms"] for doc in index.documents.values()}
+    # Page a was up to date, so its stored terms were reused as they were.
+    assert terms == {
+        "/site/a/": {"page": 1, "about": 1, "stale": 1},
+        "/site/b/": {"page": 1, "changed": 1},
+    }
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from src.serve import PageCache, TreeSnapshot
+
+
+@pytest.fixture
+def site(make_site):
+    return make_site(
+        {
+            "content/index.md": "# Home",
+            "content/blog/post.md": "# Post",
+            "content-private/secret.md": "# Secret",
+        }
+    )
+
+
+def test_tree_snapshot_detects_edits_additions_and_removals(site):
+    content = str(site / "content")
+    tree = TreeSnapshot(content)
+    assert tree.poll() == set()
+    os.utime(site / "content" / "index.md", ns=(1, 1))
+    (site / "content" / "blog" / "post.md").unlink()
+    (site / "content" / "new.md").write_text("# New")
+    (site / "content" / "docs").mkdir()
+    (site / "content" / "docs" / "a.md").write_text("# A")
+    assert tree.poll() == {
+        os.path.join(content, "index.md"),
+        os.path.join(content, "blog", "post.md"),
+        os.path.join(content, "new.md"),
+        os.path.join(content, "docs", "a.md"),
+    }
+    os.rename(site / "content" / "docs", site / "content-private" / "docs")
+    assert tree.poll() == {os.path.join(content, "docs", "a.md")}
+    assert os.path.join(content, "docs", "a.md") not in tree.files
+
+
+def test_tree_snapshot_lists_only_changed_directories(site, monkeypatch):
+    tree = TreeSnapshot(str(site / "content"), str(site / "template.html"))
+    listed = []
+    scandir = os.scandir
+    monkeypatch.setattr(
+        os, "scandir", lambda path: listed.append(path) or scandir(path)
+    )
+
+    (site / "template.html").write_text("{{ Content }}")
+    (site / "content" / "index.md").write_text("# Edited in place")
+    assert tree.poll() == {
+        str(site / "template.html"),
+        str(site / "content" / "index.md"),
+    }
+    assert listed == []
+    (site / "content" / "blog" / "other.md").write_text("# Other")
+    assert tree.poll() == {str(site / "content" / "blog" / "other.md")}
+    assert listed == [str(site / "content" / "blog")]
+
+
+@pytest.mark.parametrize(
+    "basepath, url_path, expected",
+    [
+        ("/", "/", "index.md"),
+        ("/", "/blog/post", "blog/post.md"),
+        ("/", "/blog/post.html", "blog/post.md"),
+        ("/site/", "/site/blog/post/", "blog/post.md"),
+        ("/", "/index.css", None),
+        ("/", "/../template.html", None),
+        ("/", "/../content-private/secret", None),
+        ("/site/", "/blog/post", None),
+    ],
+)
+def test_page_cache_source_for(site, basepath, url_path, expected):
+    cache = PageCache(basepath, str(site / "content"), str(site / "template.html"))
+    source = cache.source_for(url_path)
+    if expected is None:
+        assert source is None
+    else:
+        assert source == os.path.normpath(site / "content" / expected)
+
+
+def test_page_cache_renders_and_invalidates(site):
+    cache = PageCache("/", str(site / "content"), str(site / "template.html"))
+    source = cache.source_for("/")
+    assert cache.get(source) == b"<title>Home</title><div><h1>Home</h1></div>"
+
+    (site / "content" / "index.md").write_text("# Changed")
+    assert cache.get(source) == b"<title>Home</title><div><h1>Home</h1></div>"
+    cache.invalidate([source])
+    assert cache.get(source) == b"<title>Changed</title><div><h1>Changed</h1></div>"
+
+
+def test_page_cache_dependents(site):
+    (site / "partials").mkdir()
+    (site / "partials" / "nav.html").write_text("<nav></nav>")
+    layout = site / "content" / "blog" / "_layout.html"
+    layout.write_text("{{> nav }}{{ Content }}")
+    cache = PageCache("/", str(site / "content"), str(site / "template.html"))
+    home = cache.source_for("/")
+    post = cache.source_for("/blog/post")
+    cache.get(home)
+    cache.get(post)
+
+    nav = os.path.normpath(site / "partials" / "nav.html")
+    assert cache.dependents([nav]) == {post}
+    assert cache.dependents([cache.template_path]) == {home}
+    new_layout = os.path.normpath(site / "content" / "_layout.html")
+    assert cache.dependents([new_layout]) == {home, post}
@@ -0,0 +1,133 @@
+import os
+
+import pytest
+
+from src.template import Template, find_layout, load_template
+from src.urls import UrlResolver
+
+
+@pytest.mark.parametrize(
+    "text, context, expected",
+    [
+        ("<p>static</p>", {}, "<p>static</p>"),
+        (
+            "<title>{{ Title }}</title>{{ Content }}",
+            {"Title": "Home", "Content": "<p>hi</p>"},
+            "<title>Home</title><p>hi</p>",
+        ),
+        (
+            "{{Title}}|{{  Title  }}|{{ author_name }}",
+            {"Title": "A", "author_name": "B"},
+            "A|A|B",
+        ),
+    ],
+    ids=["no slots", "title and content", "arbitrary and repeated slots"],
+)
+def test_template_render(text, context, expected):
+    assert Template.compile(text).render(context) == expected
+
+
+def test_template_compile_segments():
+    template = Template.compile("a{{ x }}b{{ y }}")
+    assert template.literals == ["a", "b", ""]
+    assert template.slots == ["x", "y"]
+
+
+def test_template_basepath_applied_at_compile_time():
+    template = Template.compile(
+        '<link href="/index.css" />{{ Content }}', UrlResolver("/site/")
+    )
+    assert template.render({"Content": 'href="/raw"'}) == (
+        '<link href="/site/index.css" />href="/raw"'
+    )
+
+
+def test_template_missing_variable():
+    with pytest.raises(ValueError, match="template variable 'Title' is not defined"):
+        Template.compile("{{ Title }}").render({})
+
+
+def test_load_template_is_cached_until_changed(tmp_path):
+    path = tmp_path / "template.html"
+    path.write_text("{{ Title }}")
+    first = load_template(path)
+    assert load_template(path) is first
+
+    path.write_text("<h1>{{ Title }}</h1>")
+    os.utime(path, ns=(1, 1))
+    second = load_template(path)
+    assert second is not first
+    assert second.render({"Title": "x"}) == "<h1>x</h1>"
+
+
+def test_template_render_streamed_slot():
+    template = Template.compile("<article>{{ Content }}</article>")
+    chunks = iter(["<p>", "streamed", "</p>"])
+    assert template.render({"Content": chunks}) == "<article><p>streamed</p></article>"
+
+
+@pytest.fixture
+def partials(tmp_path):
+    directory = tmp_path / "partials"
+    directory.mkdir()
+    (directory / "header.html").write_text("<header>{{> nav }}</header>")
+    (directory / "nav.html").write_text('<a href="/">{{ Title }}</a>')
+    (directory / "footer.html").write_text("<footer></footer>")
+    return directory
+
+
+def test_load_template_includes_partials(tmp_path, partials):
+    path = tmp_path / "template.html"
+    path.write_text("{{> header }}{{ Content }}{{>footer}}")
+    template = load_template(path, UrlResolver("/site/"))
+    assert template.render({"Title": "Home", "Content": "<p>hi</p>"}) == (
+        '<header><a href="/site/">Home</a></header><p>hi</p><footer></footer>'
+    )
+    assert template.dependencies == (
+        str(path),
+        str(partials / "header.html"),
+        str(partials / "nav.html"),
+        str(partials / "footer.html"),
+    )
+
+
+def test_load_template_recompiles_when_a_partial_changes(tmp_path, partials):
+    path = tmp_path / "template.html"
+    path.write_text("{{> footer }}")
+    first = load_template(path)
+    assert load_template(path) is first
+
+    (partials / "footer.html").write_text("<footer>new</footer>")
+    os.utime(partials / "footer.html", ns=(1, 1))
+    assert load_template(path).render({}) == "<footer>new</footer>"
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("{{> missing }}", "partial 'missing' not found"),
+        ("{{> loop }}", "partial 'loop' includes itself"),
+    ],
+)
+def test_load_template_partial_errors(tmp_path, partials, text, message):
+    (partials / "loop.html").write_text("<div>{{> loop }}</div>")
+    path = tmp_path / "template.html"
+    path.write_text(text)
+    with pytest.raises(ValueError, match=message):
+        load_template(path)
+
+
+def test_find_layout_uses_nearest_directory(tmp_path):
+    content = tmp_path / "content"
+    (content / "blog" / "post").mkdir(parents=True)
+    (content / "about").mkdir()
+    (content / "blog" / "_layout.html").write_text("blog")
+    default = str(tmp_path / "template.html")
+
+    def layout(page):
+        return find_layout(str(content / page), str(content), default)
+
+    assert layout("blog/post/index.md") == str(content / "blog" / "_layout.html")
+    assert layout("blog/index.md") == str(content / "blog" / "_layout.html")
+    assert layout("about/index.md") == default
+    assert layout("index.md") == default
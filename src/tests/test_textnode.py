@@ -63,3 +63,10 @@ def test_text_node_to_html_node(
     assert html_node.tag == expected_tag
     assert html_node.value == expected_value
     assert html_node.props == expected_props
+
+
+def test_text_node_has_no_instance_dict():
+    node = TextNode("This is a text node", TextType.TEXT)
+    assert not hasattr(node, "__dict__")
+    with pytest.raises(AttributeError):
+        node.extra = "not allowed"
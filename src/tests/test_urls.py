@@ -0,0 +1,85 @@
+import pytest
+
+from src.htmlnode import FrozenNode, LeafNode, ParentNode
+from src.page import render_page
+from src.urls import UrlResolver
+
+
+@pytest.mark.parametrize(
+    "basepath, url, expected",
+    [
+        ("/", "/index.css", "/index.css"),
+        ("/site/", "/index.css", "/site/index.css"),
+        ("/site", "/blog/", "/site/blog/"),
+        ("/site/", "https://example.com/a", "https://example.com/a"),
+        ("/site/", "//cdn.example.com/a.js", "//cdn.example.com/a.js"),
+        ("/site/", "relative/page", "relative/page"),
+        ("/site/", "#top", "#top"),
+    ],
+)
+def test_resolve(basepath, url, expected):
+    assert UrlResolver(basepath).resolve(url) == expected
+
+
+def test_rewrite_attributes():
+    html = """<link href="/a.css" /><img src='/b.png' data-src="/c" alt="src=/d">"""
+    assert UrlResolver("/site/").rewrite_attributes(html) == (
+        """<link href="/site/a.css" /><img src='/site/b.png' data-src="/c" alt="src=/d">"""
+    )
+
+
+def test_resolver_equality():
+    assert UrlResolver("/site") == UrlResolver("/site/")
+    assert hash(UrlResolver("/site")) == hash(UrlResolver("/site/"))
+    assert UrlResolver("/a/") != UrlResolver("/b/")
+
+
+def test_props_to_html_resolves_only_url_props():
+    node = LeafNode("img", "", {"src": "/a.png", "alt": "/a.png", "title": "x"})
+    assert node.to_html(UrlResolver("/site/")) == (
+        '<img src="/site/a.png" alt="/a.png" title="x"></img>'
+    )
+
+
+def test_frozen_node_renders_with_other_resolver():
+    node = FrozenNode(
+        ParentNode("p", [LeafNode("a", "x", {"href": "/a"})]), UrlResolver("/one/")
+    )
+    assert node.to_html(UrlResolver("/one/")) == '<p><a href="/one/a">x</a></p>'
+    assert node.to_html(UrlResolver("/two/")) == '<p><a href="/two/a">x</a></p>'
+
+
+def test_render_page_rewrites_urls_not_text(tmp_path):
+    template = tmp_path / "template.html"
+    template.write_text('<link href="/index.css" />{{ Content }}')
+    markdown = (
+        "# Title\n\n"
+        "![logo](/images/logo.png) and [home](/)\n\n"
+        '```\n<a href="/raw">not a link</a>\n```'
+    )
+    html = "".join(render_page(UrlResolver("/site/"), markdown, str(template)))
+    assert html == (
+        '<link href="/site/index.css" /><div><h1>Title</h1>'
+        '<p><img src="/site/images/logo.png" alt="logo"></img> and '
+        '<a href="/site/">home</a></p>'
+        '<pre><code><a href="/raw">not a link</a></code></pre></div>'
+    )
+
+
+def test_resolve_fingerprinted_assets():
+    assets = {"/index.css": "/index.0123456789.css"}
+    resolver = UrlResolver("/site/", assets)
+    assert resolver.resolve("/index.css") == "/site/index.0123456789.css"
+    assert resolver.resolve("/index.css?v=1#x") == "/site/index.0123456789.css?v=1#x"
+    assert resolver.resolve("/other.css") == "/site/other.css"
+    assert resolver.rewrite_attributes('<link href="/index.css">') == (
+        '<link href="/site/index.0123456789.css">'
+    )
+    assert resolver != UrlResolver("/site/")
+    assert resolver == UrlResolver("/site/", dict(assets))
+    assert resolver != UrlResolver("/site/", {"/a": "/b"})
+    assert resolver.key == UrlResolver("/site/", {"/a": "/b"}).key == "/site/"
+    assert resolver.references(["/index.css?v=1", "/a"]) == {
+        "/index.css": ["/index.0123456789.css", None],
+        "/a": [None, None],
+    }
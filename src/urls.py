@@ -0,0 +1,121 @@
+import hashlib
+import json
+import re
+
+from src.htmlnode import URL_PROPS
+
+RE_URL_ATTRIBUTE = re.compile(
+    r"""(?<=\s)(%s)=(["'])(.*?)\2""" % "|".join(sorted(URL_PROPS)), re.IGNORECASE
+)
+RE_URL_SUFFIX = re.compile(r"[?#]")
+
+
+class UrlResolver:
+    """Maps the site-absolute URLs used in content and templates (`/path`)
+    onto the URLs of the deployed site.
+
+    It is applied to `href` and `src` attributes only, while nodes are
+    serialized and when templates are compiled, so text that merely looks
+    like an attribute (in code blocks or prose) is left alone. Protocol
+    relative (`//host`) and external URLs are returned unchanged.
+
+    `assets` maps the URLs of static files to their fingerprinted copies
+    (`/index.css` to `/index.1a2b3c4d5e.css`), keeping any query string or
+    fragment. `images` maps the URLs of images to their `(width, height)`,
+    which `<img>` tags are given when serialized. `key` identifies the
+    basepath only: pages record the `references` of the URLs they use
+    instead, so a changed asset or image only affects the pages using it.
+    """
+
+    def __init__(
+        self,
+        basepath: str = "/",
+        assets: dict[str, str] | None = None,
+        images: dict[str, tuple[int, int]] | None = None,
+    ):
+        if not basepath.endswith("/"):
+            basepath += "/"
+        self.basepath = basepath
+        self.assets = dict(assets) if assets else {}
+        self.images = dict(images) if images else {}
+        self.key = basepath
+        self._mappings_key = (
+            _digest(self.assets) if self.assets else None,
+            _digest(self.images) if self.images else None,
+        )
+
+    def resolve(self, url: str) -> str:
+        if url.startswith("/") and not url.startswith("//"):
+            if self.assets:
+                url = self._fingerprint(url)
+            return self.basepath + url[1:]
+        return url
+
+    def image_size(self, url: str) -> tuple[int, int] | None:
+        """The dimensions of the image at `url` (as written in the content),
+        if known."""
+        if not self.images:
+            return None
+        match = RE_URL_SUFFIX.search(url)
+        if match is not None:
+            url = url[: match.start()]
+        return self.images.get(url)
+
+    def references(self, urls) -> dict[str, list]:
+        """How every site-absolute URL in `urls` currently resolves, keyed by
+        its path: `[fingerprinted path, image size]`, either being None
+        where the URL is not a known asset or image."""
+        references = {}
+        for url in urls:
+            if not url.startswith("/") or url.startswith("//"):
+                continue
+            match = RE_URL_SUFFIX.search(url)
+            if match is not None:
+                url = url[: match.start()]
+            size = self.images.get(url)
+            references[url] = [
+                self.assets.get(url),
+                list(size) if size is not None else None,
+            ]
+        return references
+
+    def _fingerprint(self, url: str) -> str:
+        match = RE_URL_SUFFIX.search(url)
+        if match is None:
+            return self.assets.get(url, url)
+        path = url[: match.start()]
+        return self.assets.get(path, path) + url[match.start() :]
+
+    @staticmethod
+    def attribute_urls(html: str) -> list[str]:
+        """The URL of every `href`/`src` attribute in `html`."""
+        return [match.group(3) for match in RE_URL_ATTRIBUTE.finditer(html)]
+
+    def rewrite_attributes(self, html: str) -> str:
+        """Resolve the URL of every `href`/`src` attribute in `html`."""
+
+        def replace(match):
+            name, quote, url = match.groups()
+            return f"{name}={quote}{self.resolve(url)}{quote}"
+
+        return RE_URL_ATTRIBUTE.sub(replace, html)
+
+    def _key(self) -> tuple:
+        return (self.key, *self._mappings_key)
+
+    def __eq__(self, other):
+        return isinstance(other, UrlResolver) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (
+            f"UrlResolver(basepath={self.basepath!r}, assets={len(self.assets)}, "
+            f"images={len(self.images)})"
+        )
+
+
+def _digest(mapping: dict) -> str:
+    data = json.dumps(sorted(mapping.items())).encode()
+    return hashlib.sha256(data).hexdigest()[:16]